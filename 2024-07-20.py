@@ -1,14 +1,26 @@
 import streamlit as st
 from streamlit_mic_recorder import mic_recorder
-import whisper
-import tempfile
-import openai
 import os
+import json
 import warnings
+import shutil
 from pydub import AudioSegment
-import subprocess
 import time
-import platform
+from concurrent.futures import ThreadPoolExecutor
+import asr
+import asr_pool
+import caches
+import assistant_threads
+import speech_pipeline
+import audio_merge
+import tts
+import openai_client
+import rag_sync
+import local_rag
+import recordings
+import metrics
+import subtitles
+from translation import TRANSLATION_MODEL, ASSISTANT_ID, VECTOR_STORE_ID, translator_call, gpt_call, translate_batch
 
 # 하단 고정 텍스트와 스타일 조정
 st.markdown(
@@ -69,16 +81,10 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# ffmpeg 경로 찾기 함수
+# ffmpeg 경로 찾기 함수 (프로세스당 한 번만, 하위 프로세스 없이 PATH 에서 찾음)
+@st.cache_resource
 def find_ffmpeg():
-    try:
-        if platform.system() == "Windows":
-            ffmpeg_path = subprocess.check_output(['where', 'ffmpeg']).decode().strip().split('\r\n')[0]
-        else:
-            ffmpeg_path = subprocess.check_output(['which', 'ffmpeg']).decode().strip().split('\n')[0]
-        return ffmpeg_path
-    except subprocess.CalledProcessError:
-        return None
+    return shutil.which('ffmpeg')
 
 # ffmpeg 경로 설정
 ffmpeg_path = find_ffmpeg()
@@ -87,27 +93,68 @@ if ffmpeg_path:
 else:
     st.error("ffmpeg 경로를 찾을 수 없습니다. ffmpeg가 설치되어 있는지 확인하세요.")
 
+# 단계별 지연 시간 /metrics 서버 (METRICS_PORT 를 설정했을 때만, 프로세스당 한 번)
+@st.cache_resource
+def start_metrics_server():
+    return metrics.serve()
+
+start_metrics_server()
+
 # Suppress FP16 warning
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
 
-# Load the Whisper model
+# Load the ASR engine (ASR_BACKEND 로 백엔드, ASR_WORKERS 로 세션 공유 워커 프로세스 수 선택)
+# 로드는 백그라운드에서 하고 화면은 바로 그림, 전사할 때 get_model() 로 기다림
 @st.cache_resource
 def load_whisper_model():
-    return whisper.load_model("small")
+    return asr.load_in_background(asr_pool.load_pooled_engine, "small")
 
-model = load_whisper_model()
-api_key = os.getenv('OPENAI_API_KEY')  # 환경 변수에서 API 키를 가져옵니다.
-openai.api_key = api_key
+model_loading = load_whisper_model()
 
-client = openai
+def get_model():
+    if not model_loading.done():
+        with st.spinner("Loading speech recognition model..."):
+            return model_loading.result()
+    return model_loading.result()
+
+# 세션 간 공유되는 전사 결과 디스크 캐시
+@st.cache_resource
+def load_transcription_cache():
+    return caches.transcription_cache()
+
+transcription_cache = load_transcription_cache()
+
+# 세션 간 공유되는 번역 결과 캐시
+@st.cache_resource
+def load_translation_cache():
+    return caches.translation_cache()
+
+translation_cache = load_translation_cache()
+
+# 세션 간 공유되는 TTS 음성 디스크 캐시
+@st.cache_resource
+def load_tts_cache():
+    return caches.tts_cache()
+
+tts_cache = load_tts_cache()
+api_key = os.getenv('OPENAI_API_KEY')  # 환경 변수에서 API 키를 가져옵니다.
 if not api_key:
     raise ValueError("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
 
+# 커넥션 풀, 동시 요청 수 / 분당 요청 수 제한, 재시도가 설정된 프로세스 공유 클라이언트
+# openai import 는 느리므로 백그라운드에서 미리 하고, client 는 처음 쓸 때 공유 클라이언트로 연결
+@st.cache_resource
+def warm_up_openai():
+    openai_client.warm_up()
+
+warm_up_openai()
+client = openai_client.LazyClient()
+
 # 벡터 스토어의 모든 파일을 삭제하는 함수
 def delete_all_files_in_vector(vector_store_id, file_list):
     for file in file_list:
         file_id = file.id
-        response = client.beta.vector_stores.files.delete(vector_store_id=vector_store_id, file_id=file_id)
+        response = client.vector_stores.files.delete(vector_store_id=vector_store_id, file_id=file_id)
 
 # openai에 업로드 된 모든 파일 삭제
 def delete_all_files():
@@ -127,20 +174,32 @@ def delete_messages(id):
         message_id = message.id
         deleted_message_response = client.beta.threads.messages.delete(thread_id=id, message_id=message_id)
 
-# Initialize openai assistent
-if 'vector_store_id' not in st.session_state:
-    st.session_state.vector_store_id = "vs_bHT7TcS6HrVHAYcNgeh48lKE"
-    vector_store_files = client.beta.vector_stores.files.list(vector_store_id=st.session_state.vector_store_id)
-    # 파일 목록에서 모든 파일 삭제하기
-    #delete_all_files_in_vector(st.session_state.vector_store_id, vector_store_files)
-    #delete_all_files()
+# 세션마다 별도의 스레드를 풀에서 할당 (메시지가 많아지면 교체하고 이전 스레드는 백그라운드에서 정리)
+@st.cache_resource
+def load_thread_pool():
+    return assistant_threads.AssistantThreadPool(client, delete_messages)
+
+# 세션 간 공유되는 RAG 업로드 매니페스트 (내용 해시 → file_id / 벡터 스토어)
+@st.cache_resource
+def load_rag_manifest():
+    return rag_sync.FileManifest()
+
+rag_manifest = load_rag_manifest()
+
+# RAG 방식: 원격 Assistants 벡터 스토어 또는 로컬 임베딩 인덱스 (환경 변수 RAG_MODE 로 기본값 설정)
+RAG_MODES = {'remote': "Assistants (remote)", 'local': "Local index"}
+rag_mode = os.getenv("RAG_MODE", "remote")
 
-if 'thread_id' not in st.session_state:
-    st.session_state.thread_id = "thread_nJyOZmEHQaabCI1wcOLjzgNs"
-    #delete_messages(st.session_state.thread_id)
+# 세션 간 공유되는 로컬 벡터 인덱스 (임베딩은 디스크에 memmap 으로 저장)
+@st.cache_resource
+def load_local_index():
+    return local_rag.LocalIndex(local_rag.OpenAIEmbedder(client))
+
+if 'thread_lease' not in st.session_state:
+    st.session_state.thread_lease = load_thread_pool().lease()
 
 if 'assistant_id' not in st.session_state:
-    st.session_state.assistant_id = "asst_QvnqTXw1LoxeqmwHAn2IMVoW"
+    st.session_state.assistant_id = ASSISTANT_ID
 
 if 'uploader' not in st.session_state:
     st.session_state.uploader = False
@@ -154,17 +213,10 @@ if 'uploaded_file_ids' not in st.session_state:
 def state_uploader():
     st.session_state.uploader = True
 
-# Initialize session state lists
-if 'transcriptions' not in st.session_state:
-    st.session_state.transcriptions = []
-if 'file_paths' not in st.session_state:
-    st.session_state.file_paths = []
-if 'ts_texts' not in st.session_state:
-    st.session_state.ts_texts = []
-if 'tts_audio_data' not in st.session_state:
-    st.session_state.tts_audio_data = []
-if 'retranslated_tts_audio_data' not in st.session_state:
-    st.session_state.retranslated_tts_audio_data = []
+# 녹음 목록 (고정 id 레코드, 오디오는 필요할 때만 읽음)
+if 'recordings' not in st.session_state:
+    st.session_state.recordings = recordings.RecordingStore()
+store = st.session_state.recordings
 
 if 'is_recording' not in st.session_state:
     st.session_state.is_recording = False
@@ -178,79 +230,92 @@ if 'temp_page' not in st.session_state:
 if 'is_re_recording' not in st.session_state:
     st.session_state.is_re_recording = False
 
-def transcribe_audio(file_path):
-    result = model.transcribe(file_path, language='ko')
-    return result['text']
-
-def translator_call(client, text, selected_language, selected_tone):
-    content = f"First Your main task is to translate given text to {selected_language}. Do not provide me with anything other than the translation. for example 저는 회계 원리를 좋아합니다 -> 我喜欢会计原理 is a very wrong example"
-    if selected_tone == "Politely and Academically":
-        content += "and Second, the tone of the translated sentences must be very polite and academic. this mean you can change the word to be very polite and academic"
-    if selected_tone == "Angry and Fierce":
-        content += "and Second, the tone of the translated sentences must be very angry and fierce. this mean you can change the word to be very angry and fierce"
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": content},
-            {"role": "user", "content": text}
-        ]
-    )
-    return completion.choices[0].message.content
-
-def gpt_call(client, text, selected_language, selected_tone):
-    thread_id = "thread_nJyOZmEHQaabCI1wcOLjzgNs"
-    
-    thread_message = client.beta.threads.messages.create(thread_id, role="user", content=text)    
-    
-    content = f"You are a presentation script maker. Access the user's statements and the given files, read them thoroughly, and if there is content in the provided files that can enrich the user's statements, use it to enhance the user's statements. Convey the enriched content exactly as it is to the user. Please translate the enriched content into {selected_language} and provide it to the user, and no other language. and Do not include automatically generated citations or references in the response under any circumstances."
-
-    if selected_tone == "Politely and Academically":
-        content += " and the tone of the translated sentences must be very polite and academic. this mean you can change the word to be very polite and academic"
-    if selected_tone == "Angry and Fierce":
-        content += " and the tone of the translated sentences must be very angry and fierce. this mean you can change the word to be very angry and fierce"
-
-    #과거 recording 참조 금지
-    content += "Finally, never reference the context within the thread."
-    
-    run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id="asst_QvnqTXw1LoxeqmwHAn2IMVoW", instructions=content)
-    run_id = run.id
-    
-    # Check if the run has been completed within a short time period
-    timeout = 25  # Timeout period in seconds
-    interval = 0.5  # Interval period to check in seconds
-    elapsed_time = 0
-    
-    while elapsed_time < timeout:
-        time.sleep(interval)
-        elapsed_time += interval
-        
-        run_status = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
-        if run_status.status == "completed":
-            thread_messages = client.beta.threads.messages.list(thread_id)
-            if thread_messages.data and thread_messages.data[0].content[0].text.value:
-                return thread_messages.data[0].content[0].text.value
-    
-    # If the message is not processed within the timeout period
-    return "The process was not completed within the expected time."
+# 캐시 키는 모델 로드 없이 설정으로 만들고, 캐시에 없을 때만 get_model() 로 로드를 기다림
+ASR_MODEL_NAME = asr.engine_name("small")
+
+def transcribe_audio(audio_data, on_partial=None, segments=None):
+    return asr.transcribe_audio(get_model, audio_data, language='ko', cache=transcription_cache, on_partial=on_partial, segments=segments, model_name=ASR_MODEL_NAME)
+
+# 긴 오디오 파일은 무음 기준으로 나눠서 워커 풀에서 병렬로 전사 ({'text', 'segments'} 반환)
+def transcribe_file(audio_data, on_progress=None):
+    return asr.transcribe_file(get_model, audio_data, language='ko', cache=transcription_cache, on_progress=on_progress, model_name=ASR_MODEL_NAME)
+
+# 캐시를 거쳐서 번역 (같은 번역 요청이 동시에 들어오면 API 호출 한 번을 공유)
+# 스크립트 스레드가 아닌 곳에서 RAG 번역을 할 때는 thread_lease / local_index 를 직접 넘겨야 함
+def translate(text, selected_language, selected_tone, use_rag, on_partial=None, thread_lease=None, local_index=None):
+    if use_rag and rag_mode == 'local':
+        # 로컬 인덱스에서 관련 문단을 찾아서 chat completion 에 같이 넣음 (인덱스가 바뀌면 캐시 키도 바뀜)
+        index = local_index or load_local_index()
+        key = caches.translation_key(text, selected_language, selected_tone, f"local:{TRANSLATION_MODEL}:{index.version}", use_rag)
+        def compute():
+            passages = [chunk['text'] for _, chunk in index.search(text)]
+            return translator_call(client, text, selected_language, selected_tone, on_partial, passages=passages)
+        return translation_cache.get_or_compute(key, compute)
+    if use_rag:
+        # 벡터 스토어의 파일이 바뀌면 같은 문장도 다른 번역이 나올 수 있으므로 파일 목록 버전을 키에 포함
+        key = caches.translation_key(text, selected_language, selected_tone, f"{ASSISTANT_ID}:{rag_manifest.version(VECTOR_STORE_ID)}", use_rag)
+        thread_lease = thread_lease or st.session_state.thread_lease
+        return translation_cache.get_or_compute(key, lambda: gpt_call(client, text, selected_language, selected_tone, thread_lease, on_partial))
+    key = caches.translation_key(text, selected_language, selected_tone, TRANSLATION_MODEL, use_rag)
+    return translation_cache.get_or_compute(key, lambda: translator_call(client, text, selected_language, selected_tone, on_partial))
 
 def text_to_speech(client, text):
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice="echo", #voice 설정 가능하면 참 좋을텐데
-        input=text
+    return tts.text_to_speech(client, text, cache=tts_cache)
+
+def translate_and_speak(text, selected_language, selected_tone, use_rag, thread_lease=None, local_index=None):
+    translated_text = translate(text, selected_language, selected_tone, use_rag, thread_lease=thread_lease, local_index=local_index)
+    return translated_text, text_to_speech(client, translated_text)
+
+# 한 transcription 을 여러 언어로 동시에 번역 + TTS, 언어별 future 반환
+def translate_many(text, target_languages, selected_tone, use_rag):
+    # RAG 는 한 스레드의 run 이 순서대로 실행되므로 언어마다 별도 스레드를 임대
+    use_threads = use_rag and rag_mode == 'remote'
+    thread_pool = load_thread_pool() if use_threads else None
+    # 로컬 인덱스도 st.cache_resource 이므로 스크립트 스레드에서 가져와서 넘김
+    local_index = load_local_index() if use_rag and rag_mode == 'local' else None
+    with ThreadPoolExecutor(max_workers=len(target_languages)) as executor:
+        return {
+            language: executor.submit(translate_and_speak, text, language, selected_tone, use_rag, thread_pool.lease() if use_threads else None, local_index)
+            for language in target_languages
+        }
+
+# 자막 세그먼트를 묶음 단위로 번역 (묶음마다 번역 캐시 사용), 같은 시간의 번역 자막 표 반환
+def translate_subtitles(table, selected_language, selected_tone):
+    def translate_texts(texts):
+        key = caches.translation_key(json.dumps(texts, ensure_ascii=False), selected_language, selected_tone, f"segments:{TRANSLATION_MODEL}", False)
+        return translation_cache.get_or_compute(key, lambda: translate_batch(client, texts, selected_language, selected_tone))
+    return subtitles.translate_table(table, translate_texts)
+
+SUBTITLE_MIME = {'srt': "application/x-subrip", 'vtt': "text/vtt"}
+
+# 원문 자막 다운로드 + 선택한 언어로 번역한 자막 다운로드 (key 는 위젯 구분용)
+def subtitle_downloads(table, name, key, selected_language, selected_tone):
+    if not table:
+        return
+    subtitle_format = st.radio("Subtitles", list(subtitles.FORMATS), format_func=str.upper, horizontal=True, key=f"subtitle_format_{key}")
+    render = subtitles.FORMATS[subtitle_format]
+    st.download_button(
+        label="Download subtitles",
+        data=render(table),
+        file_name=f"{name}.{subtitle_format}",
+        mime=SUBTITLE_MIME[subtitle_format],
+        key=f"subtitle_download_{key}"
     )
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp_audio_file:
-        response.stream_to_file(tmp_audio_file.name)
-        tmp_file_name = tmp_audio_file.name
-    
-    return tmp_file_name
+    if st.button(f"Translate subtitles to {selected_language}", key=f"subtitle_translate_{key}"):
+        with st.spinner(f"Translating {len(table)} subtitle segments..."):
+            st.session_state[f"translated_subtitles_{key}"] = (selected_language, translate_subtitles(table, selected_language, selected_tone))
+    if f"translated_subtitles_{key}" in st.session_state:
+        language, translated = st.session_state[f"translated_subtitles_{key}"]
+        st.download_button(
+            label=f"Download {language} subtitles",
+            data=render(translated),
+            file_name=f"{name}.{language}.{subtitle_format}",
+            mime=SUBTITLE_MIME[subtitle_format],
+            key=f"subtitle_download_translated_{key}"
+        )
 
 def delete_files(i):
-    del st.session_state.transcriptions[i]
-    del st.session_state.file_paths[i]
-    del st.session_state.ts_texts[i]
-    del st.session_state.tts_audio_data[i]
-    del st.session_state.retranslated_tts_audio_data[i]
+    store.delete(store.at(i).id)
 
 def state_recode():
     st.session_state.is_recording = True
@@ -261,12 +326,11 @@ def state_re_recode():
     delete_files(st.session_state.temp_page)
     st.session_state.is_re_recording = True
 
+# 세션별 병합 트랙, 새로 추가된 녹음만 인코딩하고 나머지는 인코딩된 조각을 재사용 (mp3 바이트 반환)
 def merge_audios_with_silence(audio_files, silence_duration=700):
-    combined = AudioSegment.empty()
-    silence = AudioSegment.silent(duration=silence_duration)
-    for audio_file in audio_files:
-        combined += AudioSegment.from_file(audio_file) + silence
-    return combined
+    if 'merged_track' not in st.session_state or st.session_state.merged_track.silence_duration != silence_duration:
+        st.session_state.merged_track = audio_merge.MergedTrack(silence_duration)
+    return st.session_state.merged_track.build(audio_files)
 
 def none_fuc():
     time.sleep(0.3)
@@ -285,8 +349,18 @@ col1_tone, col2_file_uploader = st.columns([1, 1])
 with col1_tone:
     selected_tone = st.radio(label="Tone", options=tones, index=0, horizontal=True)
     use_rag = st.toggle("Using RAG")
+    if use_rag:
+        rag_mode = st.radio(label="RAG", options=list(RAG_MODES), index=list(RAG_MODES).index(rag_mode), format_func=RAG_MODES.get, horizontal=True)
     
 if use_rag:   
+    # Initialize openai assistent (RAG 를 켰을 때만 벡터 스토어 조회)
+    if rag_mode == 'remote' and 'vector_store_id' not in st.session_state:
+        st.session_state.vector_store_id = VECTOR_STORE_ID
+        vector_store_files = client.vector_stores.files.list(vector_store_id=st.session_state.vector_store_id)
+        # 파일 목록에서 모든 파일 삭제하기
+        #delete_all_files_in_vector(st.session_state.vector_store_id, vector_store_files)
+        #delete_all_files()
+
     with col2_file_uploader:
         uploaded_files = st.file_uploader("Upload File", type=['txt', 'doc', 'docx', 'pdf', 'pptx'], accept_multiple_files=True, on_change=state_uploader)
 
@@ -295,91 +369,54 @@ if use_rag:
             st.session_state.uploader = False
             st.session_state.uploader_list = uploaded_files
 
-            for uploaded_file in uploaded_files:
-                # 파일을 저장할 경로 설정
-                file_path = uploaded_file.name
-            
-                # 파일을 저장
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-            
-                try:
-                    # OpenAI API를 통해 파일 업로드
-                    with open(file_path, "rb") as f:
-                        response = client.files.create(
-                            file=f,
-                            purpose="assistants"
-                        )
-                
-                    # 업로드 결과 출력
-                    st.write(f"파일 업로드 완료: {uploaded_file.name}")
-                    st.write(response)
-
-                    file_id = response.id
-
-                    st.session_state.uploaded_file_ids.append(file_id)
-
-                    # 벡터 스토어에 파일 업로드
+            if rag_mode == 'local':
+                # 로컬 인덱스에 없는 문서만 조각내서 임베딩
+                index = load_local_index()
+                for uploaded_file in uploaded_files:
                     try:
-                        vector_store_response = client.beta.vector_stores.files.create(
-                            vector_store_id=st.session_state.vector_store_id,
-                            file_id=file_id
-                        )
-                    except Exception as ve:
-                        st.write(f"벡터 스토어 업로드 중 오류 발생: {file_id}")
-                        st.write(ve)
-                except Exception as e:
-                    st.write(f"파일 업로드 중 오류가 발생했습니다: {uploaded_file.name}")
-                    st.write(e)
-
-                # finally:
-                #     # 로컬 파일 삭제
-                #     if os.path.exists(file_path):
-                #         os.remove(file_path)
-                #         st.write(f"로컬 파일 삭제 완료: {uploaded_file.name}")
-                    # 중복 파일 삭제 로직
-                try:
-                    # OpenAI API를 통해 파일 리스트 조회
-                    file_list = client.files.list()
-
-                    # 파일 이름을 기준으로 중복 체크
-                    file_names = {}
-                    for file in file_list:
-                        filename = file.filename
-                        file_id = file.id
-                        if filename in file_names:
-                            # 중복된 파일 삭제
-                            client.files.delete(file_id)
-                            st.write(f"중복된 파일 삭제: {filename} (ID: {file_id})")
-                        else:
-                            file_names[filename] = file_id
-                except Exception as e:
-                    st.write("중복 파일 삭제 중 오류가 발생했습니다.")
-                    st.write(e)
+                        digest, n_chunks = index.add_document(uploaded_file.name, uploaded_file.getvalue())
+                        if n_chunks:
+                            st.write(f"로컬 인덱스에 추가: {uploaded_file.name} ({n_chunks} chunks)")
+                    except Exception as e:
+                        st.write(f"파일 인덱싱 중 오류가 발생했습니다: {uploaded_file.name}")
+                        st.write(e)
+                results = []
+            else:
+                # 매니페스트에 없는 내용만 (동시에) 업로드하고 벡터 스토어에 추가
+                results = rag_sync.sync_files(
+                    client, rag_manifest, st.session_state.vector_store_id,
+                    [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+                )
+            for name, file_id, status in results:
+                if file_id is None:
+                    st.write(f"파일 업로드 중 오류가 발생했습니다: {name}")
+                    st.write(status)
+                    continue
+                if status != "exists":
+                    st.write(f"파일 업로드 완료: {name} (ID: {file_id})")
+                if file_id not in st.session_state.uploaded_file_ids:
+                    st.session_state.uploaded_file_ids.append(file_id)
 
         elif len(uploaded_files) < len(st.session_state.uploader_list):
             st.session_state.uploader = False
             unique_to_list = [item for item in st.session_state.uploader_list if item not in uploaded_files]
             st.session_state.uploader_list = uploaded_files
-            # OpenAI API를 통해 파일 리스트 조회
-            try:
-                file_list = client.files.list()
-                file_list_data = file_list
-                vector_store_files = client.beta.vector_stores.files.list(vector_store_id=st.session_state.vector_store_id)
-
-                for file in file_list_data:
-                    if file.filename == unique_to_list[0].name:
-                        client.beta.vector_stores.files.delete(vector_store_id=st.session_state.vector_store_id, file_id=file.id)
-                        client.files.delete(file.id)
-                        st.write(f"OpenAI에서 파일 삭제: {unique_to_list[0].name}")
+            for removed_file in unique_to_list:
+                if rag_mode == 'local':
+                    if load_local_index().remove_document(removed_file.getvalue()):
+                        st.write(f"로컬 인덱스에서 삭제: {removed_file.name}")
+                    continue
+                try:
+                    file_id = rag_sync.remove_file(client, rag_manifest, st.session_state.vector_store_id, removed_file.getvalue())
+                    if file_id:
+                        st.write(f"OpenAI에서 파일 삭제: {removed_file.name}")
 
                         # 삭제된 파일의 ID를 st.session_state.uploaded_file_ids에서도 제거
-                        if file.id in st.session_state.uploaded_file_ids:
-                            st.session_state.uploaded_file_ids.remove(file.id)
-
-            except Exception as e:
-                st.write(f"파일 삭제 중 오류가 발생했습니다: {unique_to_list[0].name}")
-                st.write(e)
+                        if file_id in st.session_state.uploaded_file_ids:
+                            st.session_state.uploaded_file_ids.remove(file_id)
+                except Exception as e:
+                    st.write(f"파일 삭제 중 오류가 발생했습니다: {removed_file.name}")
+                    st.write(e)
 
 # 언어 선택 박스 (기본값을 영어로 설정)
 selected_language = st.selectbox('Language', languages, index=1)
@@ -390,160 +427,243 @@ with col1_audio:
     audio = mic_recorder(start_prompt=f"Start R{st.session_state.temp_page+1} Recording", stop_prompt="Stop", format="webm", callback=state_recode)
 
 with col2_audio:
-    if st.session_state.transcriptions:
+    if store:
         re_audio = mic_recorder(start_prompt="Re-record", stop_prompt="Stop", format="webm", callback=state_re_recode)
 
 if st.session_state.is_recording == True:
-    st.session_state.once_recording = True
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp_wav_file:
+    # 녹음 하나의 단계별 시간을 묶어서 기록
+    with metrics.request("recording"):
+        st.session_state.once_recording = True
+        # 녹음 바이트는 파일로 쓰지 않고 메모리에서 바로 디코딩/재생
         if st.session_state.is_re_recording == False:
-            tmp_wav_file.write(audio["bytes"])
+            audio_bytes = audio["bytes"]
         else:
-            tmp_wav_file.write(re_audio["bytes"])
+            audio_bytes = re_audio["bytes"]
             st.session_state.is_re_recording = False
 
-        tmp_wav_file.flush()
-        st.session_state.file_path = tmp_wav_file.name
-
-    # Initialize progress bar
-    progress_bar = st.progress(0)
-    progress_text = st.empty()
+        # Initialize progress bar
+        progress_bar = st.progress(0)
+        progress_text = st.empty()
     
-    # Transcribe audio
-    progress_text.text("Transcribing audio...")
-    transcription = transcribe_audio(st.session_state.file_path)
-    progress_bar.progress(33)
+        # Transcribe audio
+        progress_text.text("Transcribing audio...")
+        partial_text = st.empty()
+        segments = []
+        transcription = transcribe_audio(audio_bytes, on_partial=partial_text.write, segments=segments)
+        partial_text.empty()
+        progress_bar.progress(33)
+
+        # Translate text, 번역이 나오는 대로 문장 단위로 TTS 를 요청해서 첫 문장부터 바로 재생
+        # 다음 문장들은 앞 음성이 끝나면 이어서 자동 재생
+        progress_text.text("Translating text...")
+        partial_text = st.empty()
+        sentence_audio = st.container()
+
+        def play_audio(audio_file):
+            sentence_audio.audio(audio_file, format='audio/mp3', autoplay=True)
+
+        player = speech_pipeline.ChainedPlayer(play_audio, tts.audio_duration, join=tts.join_audio_files)
+        pipeline = speech_pipeline.SpeechPipeline(lambda sentence: text_to_speech(client, sentence), on_audio=lambda index, audio_file: player.add(audio_file))
+
+        def on_translated(text):
+            partial_text.write(text)
+            pipeline.feed(text)
+
+        try:
+            ts_text = translate(transcription, selected_language, selected_tone, use_rag, on_partial=on_translated)
+        except TimeoutError as e:
+            st.session_state.is_recording = False
+            st.error(str(e))
+            st.stop()
+        except Exception:
+            # 다른 오류로 끝나도 다음 rerun 에서 같은 녹음을 다시 처리하지 않도록 녹음 상태를 풀어 둠
+            st.session_state.is_recording = False
+            raise
+        partial_text.empty()
+        progress_bar.progress(66)
+
+        # Convert the rest of translated text to speech
+        progress_text.text("Converting text to speech...")
+        sentence_audios = pipeline.close(ts_text)
+        if sentence_audios:
+            tts_audio = tts.join_audio_files(sentence_audios)
+        else:
+            tts_audio = text_to_speech(client, ts_text)
+            player.add(tts_audio)
+        progress_bar.progress(100)
 
-    # Translate text
-    progress_text.text("Translating text...")
-    if use_rag:
-        ts_text = gpt_call(client, transcription, selected_language, selected_tone)
-    else:
-        ts_text = translator_call(client, transcription, selected_language, selected_tone)
-    progress_bar.progress(66)
-
-    # Convert translated text to speech
-    progress_text.text("Converting text to speech...")
-    tts_audio = text_to_speech(client, ts_text)
-    progress_bar.progress(100)
-
-    # Append results to session state lists
-    st.session_state.transcriptions.insert(st.session_state.temp_page, transcription)
-    st.session_state.file_paths.insert(st.session_state.temp_page, st.session_state.file_path)
-    st.session_state.ts_texts.insert(st.session_state.temp_page, ts_text)
-    st.session_state.tts_audio_data.insert(st.session_state.temp_page, tts_audio)
-    st.session_state.retranslated_tts_audio_data.insert(st.session_state.temp_page, tts_audio)
-
-    #temp_Page
-    st.session_state.temp_page += 1
+        # Add the recording to the session store
+        store.insert(st.session_state.temp_page, transcription, audio_bytes, ts_text, tts_audio, subtitles.SegmentTable.from_segments(segments))
 
-    st.session_state.is_recording = False
+        #temp_Page
+        st.session_state.temp_page += 1
+
+        st.session_state.is_recording = False
+
+        # 번역 음성은 여기서 끝까지 재생되므로, rerun 후 페이지에서는 전체 음성을 다시 자동 재생하지 않음
+        st.session_state.suppress_autoplay = True
+
+    # 남은 문장 음성까지 다 재생한 뒤 rerun 해서 위쪽 녹음 버튼 / Re-record 를 새 녹음 기준으로 다시 그림
+    # (녹음은 이미 저장했으므로 재생 중에 다른 버튼을 눌러 rerun 되어도 잃지 않음)
+    progress_text.text("Playing translation...")
+    player.finish()
     st.rerun()
 
+# 긴 녹음 파일 업로드 (강의 / 회의 녹음 등)
+with st.expander("Transcribe an audio file", expanded=False):
+    long_audio = st.file_uploader("Upload audio file", type=['mp3', 'wav', 'm4a', 'webm', 'ogg', 'flac', 'mp4'], key='long_audio')
+    if long_audio is not None and st.button("Transcribe file"):
+        file_progress = st.progress(0.0, text="Splitting audio on silence...")
+        file_partial_text = st.empty()
+
+        def on_file_progress(done, total, text):
+            file_progress.progress(done / total if total else 1.0, text=f"Transcribed {done}/{total} segments")
+            file_partial_text.write(text[-1000:])
+
+        with metrics.request("file"):
+            st.session_state.long_transcript = transcribe_file(long_audio.getvalue(), on_progress=on_file_progress)
+        st.session_state.long_transcript_name = os.path.splitext(long_audio.name)[0]
+        st.session_state.long_transcript_segments = subtitles.SegmentTable.from_segments(st.session_state.long_transcript['segments'])
+        st.session_state.pop("translated_subtitles_long", None)
+        file_partial_text.empty()
+
+    if 'long_transcript' in st.session_state:
+        st.text_area("File transcription", value=st.session_state.long_transcript['text'], height=200)
+        st.download_button(
+            label="Download transcription",
+            data=st.session_state.long_transcript['text'],
+            file_name=f"{st.session_state.long_transcript_name}.txt",
+            mime="text/plain"
+        )
+        subtitle_downloads(st.session_state.long_transcript_segments, st.session_state.long_transcript_name, "long", selected_language, selected_tone)
+
 st.sidebar.title("Recordings")
+if not model_loading.done():
+    st.sidebar.caption("Loading speech model...")
+elif model_loading.exception() is not None:
+    st.sidebar.caption("Speech model failed to load")
+else:
+    st.sidebar.caption("Speech model ready")
 
-if st.session_state.once_recording == True and st.session_state.transcriptions:
+if st.session_state.once_recording == True and store:
 
-    for i in range(len(st.session_state.transcriptions)):
-        button_label = f"R{i+1}: {st.session_state.transcriptions[i][:11]}"
-        if len(st.session_state.transcriptions[i]) > 11:
+    for i, record in enumerate(store):
+        button_label = f"R{i+1}: {record.transcription[:11]}"
+        if len(record.transcription) > 11:
             button_label += ".."
-        if st.sidebar.button(button_label):
+        if st.sidebar.button(button_label, key=f"recording_{record.id}"):
             st.session_state.temp_page = i+1
             st.rerun()
 
-    for i in range(len(st.session_state.transcriptions)):
-        if st.session_state.temp_page == i+1:
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                st.write(f"Transcription {i+1}:")
-                st.write(st.session_state.transcriptions[i])
-                st.audio(st.session_state.file_paths[i], format='audio/webm')
-
-                st.write(f"Translation {i+1}:")
-                st.write(st.session_state.ts_texts[i])
-                st.audio(st.session_state.tts_audio_data[i], format='audio/mp3', autoplay=True)
-            
-            with col2:
-                st.write("Tools")
-                if st.button("Listen to all saved audio"):
-                    audio_files = [st.session_state.tts_audio_data[i] for i in range(len(st.session_state.tts_audio_data))]
-                    merged_audio = merge_audios_with_silence(audio_files)
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp_file:
-                        merged_audio.export(tmp_file.name, format="mp3")
-                        tmp_file_path = tmp_file.name
-
-                      # 임시 파일을 바이너리로 읽어오기
-                    with open(tmp_file_path, "rb") as file:
-                        audio_bytes = file.read()
-
-                    st.audio(tmp_file_path, format='audio/mp3', autoplay=True)
-
-                      # 다운로드 버튼 추가
-                    st.download_button(
-                        label="Download Full Audio",
-                        data=audio_bytes,
-                        file_name="merged_audio.mp3",
-                        mime="audio/mp3",
-                        type="primary"
-                    )
-
-                excluded_list = [j+1 for j in range(len(st.session_state.transcriptions)) if j != i]
-
-                if 'delete_confirm' not in st.session_state:
+    # 현재 페이지의 녹음만 오디오를 읽어서 표시
+    if 1 <= st.session_state.temp_page <= len(store):
+        i = st.session_state.temp_page - 1
+        record = store.at(i)
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            st.write(f"Transcription {i+1}:")
+            st.write(record.transcription)
+            st.audio(store.recorded_audio(record.id), format='audio/webm')
+
+            st.write(f"Translation {i+1}:")
+            st.write(record.ts_text)
+            st.audio(store.tts_audio(record.id), format='audio/mp3', autoplay=not st.session_state.pop('suppress_autoplay', False))
+        
+        with col2:
+            st.write("Tools")
+            if st.button("Listen to all saved audio"):
+                audio_files = [store.tts_audio(rec_id) for rec_id in store.ids()]
+                audio_bytes = merge_audios_with_silence(audio_files)
+
+                st.audio(audio_bytes, format='audio/mp3', autoplay=True)
+
+                  # 다운로드 버튼 추가
+                st.download_button(
+                    label="Download Full Audio",
+                    data=audio_bytes,
+                    file_name="merged_audio.mp3",
+                    mime="audio/mp3",
+                    type="primary"
+                )
+
+            subtitle_downloads(record.segments, f"R{i+1}", f"rec_{record.id}", selected_language, selected_tone)
+
+            excluded_list = [j+1 for j in range(len(store)) if j != i]
+
+            if 'delete_confirm' not in st.session_state:
+                st.session_state.delete_confirm = False
+
+            if st.button(f"Delete R{st.session_state.temp_page} recording"):
+                st.session_state.delete_confirm = True
+
+            if st.session_state.delete_confirm:
+                st.warning("Are you sure you want to delete it?")
+                if st.button("Yes, delete it"):
+                    delete_files(i)
                     st.session_state.delete_confirm = False
+                    if st.session_state.temp_page != 1 or not store:
+                        st.session_state.temp_page -= 1
+                    st.rerun()
+                if st.button("No, keep it"):
+                    st.session_state.delete_confirm = False
+                    st.rerun()
 
-                if st.button(f"Delete R{st.session_state.temp_page} recording"):
-                    st.session_state.delete_confirm = True
-
-                if st.session_state.delete_confirm:
-                    st.warning("Are you sure you want to delete it?")
-                    if st.button("Yes, delete it"):
-                        delete_files(i)
-                        st.session_state.delete_confirm = False
-                        if st.session_state.temp_page != 1 or not st.session_state.transcriptions:
-                            st.session_state.temp_page -= 1
-                        st.rerun()
-                    if st.button("No, keep it"):
-                        st.session_state.delete_confirm = False
-                        st.rerun()
-
-                if excluded_list:
-                    # Change audio order
-                    change_option = st.selectbox("Reorder recordings", excluded_list, index=None, placeholder="Select the Recording")
-                    
-                    # Move the recording
-                    if change_option:
-                        change_option -= 1
-                        st.session_state.transcriptions.insert(change_option, st.session_state.transcriptions.pop(i))
-                        st.session_state.file_paths.insert(change_option, st.session_state.file_paths.pop(i))
-                        st.session_state.ts_texts.insert(change_option, st.session_state.ts_texts.pop(i))
-                        st.session_state.tts_audio_data.insert(change_option, st.session_state.tts_audio_data.pop(i))
-                        st.session_state.retranslated_tts_audio_data.insert(change_option, st.session_state.retranslated_tts_audio_data.pop(i))
-                        st.session_state.temp_page = change_option + 1
-                        st.rerun()
+            if excluded_list:
+                # Change audio order
+                change_option = st.selectbox("Reorder recordings", excluded_list, index=None, placeholder="Select the Recording")
+                
+                # Move the recording
+                if change_option:
+                    change_option -= 1
+                    store.move(record.id, change_option)
+                    st.session_state.temp_page = change_option + 1
+                    st.rerun()
 
 # 오른쪽 밑에 Transcriptions 리스트를 줄바꿈하여 한 번에 볼 수 있는 버튼 추가
-if st.session_state.transcriptions:
+if store:
     with st.expander("View All Transcriptions", expanded=False):
-        transcriptions_text = "\n\n".join(st.session_state.transcriptions)
+        transcriptions_text = "\n\n".join(record.transcription for record in store)
         st.text_area("All Transcriptions", value=transcriptions_text, height=200)
 
-        # 개별 transcription에 대해 재번역할 수 있는 기능 추가
-        for i, transcription in enumerate(st.session_state.transcriptions):
-            selected_language_retranslate = st.selectbox(f'Retranslate R{i+1}', languages, key=f'retranslate_{i}')
-            if st.button(f'Translate R{i+1}', key=f'translate_button_{i}'):
+        # 개별 transcription에 대해 재번역할 수 있는 기능 추가 (위젯 키는 순서가 바뀌어도 유지되도록 레코드 id 사용)
+        for i, record in enumerate(store):
+            transcription = record.transcription
+            selected_language_retranslate = st.selectbox(f'Retranslate R{i+1}', languages, key=f'retranslate_{record.id}')
+            if st.button(f'Translate R{i+1}', key=f'translate_button_{record.id}'):
                 with st.spinner(f'Translating R{i+1} to {selected_language_retranslate}...'):
-                    if use_rag:
-                        retranslated_text = gpt_call(client, transcription, selected_language_retranslate, selected_tone)
-                    else:
-                        retranslated_text = translator_call(client, transcription, selected_language_retranslate, selected_tone)
-                    
-                    retranslated_tts_audio = text_to_speech(client, retranslated_text)
-                    st.session_state.retranslated_tts_audio_data[i] = retranslated_tts_audio
+                    try:
+                        retranslated_text = translate(transcription, selected_language_retranslate, selected_tone, use_rag)
+                    except TimeoutError as e:
+                        st.error(str(e))
+                        st.stop()
 
-                    st.session_state.ts_texts[i] = retranslated_text
+                    retranslated_tts_audio = text_to_speech(client, retranslated_text)
+                    store.update_translation(record.id, retranslated_text, retranslated_tts_audio)
                     st.write(f'Retranslated R{i+1} to {selected_language_retranslate}:')
                     st.write(retranslated_text)
                     st.audio(retranslated_tts_audio, format='audio/mp3', autoplay=True)
+
+            # 여러 언어로 한 번에 번역 (다국어 청중용)
+            target_languages = st.multiselect(f'Translate R{i+1} into several languages', languages, key=f'fanout_{record.id}')
+            if target_languages and st.button(f'Translate R{i+1} into {len(target_languages)} languages', key=f'fanout_button_{record.id}'):
+                with st.spinner(f'Translating R{i+1} to {", ".join(target_languages)}...'):
+                    results = translate_many(transcription, target_languages, selected_tone, use_rag)
+                for language, result in results.items():
+                    st.write(f'R{i+1} in {language}:')
+                    try:
+                        translated_text, translated_audio = result.result()
+                    except TimeoutError as e:
+                        st.error(str(e))
+                        continue
+                    st.write(translated_text)
+                    st.audio(translated_audio, format='audio/mp3')
+
+# 단계별 지연 시간 (프로세스 전체, 최근 측정값 기준 백분위)
+latency = metrics.REGISTRY.summary()
+if latency:
+    with st.sidebar.expander("Pipeline latency", expanded=False):
+        st.table({
+            stage: {name: (value if name == "count" else f"{value * 1000:.0f} ms") for name, value in stats.items()}
+            for stage, stats in latency.items()
+        })
@@ -0,0 +1,299 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import vad
+import caches
+import metrics
+
+SAMPLE_RATE = 16000
+
+# ASR 백엔드 설정 (환경 변수)
+#   ASR_BACKEND: "whisper" (PyTorch 레퍼런스, FP32) 또는 "faster-whisper" (CTranslate2 int8)
+#   ASR_MODEL_SIZE: tiny / base / small / medium ...
+#   ASR_COMPUTE_TYPE: faster-whisper 연산 타입 (기본 int8)
+#   ASR_CPU_THREADS: faster-whisper CPU 스레드 수 (0 이면 자동)
+ASR_BACKENDS = ("whisper", "faster-whisper")
+
+# PyTorch Whisper 백엔드
+class WhisperEngine:
+    def __init__(self, model_size):
+        import whisper
+        self.name = f"whisper:{model_size}"
+        self.model = whisper.load_model(model_size, device="cpu")
+
+    def transcribe(self, audio, language=None):
+        result = self.model.transcribe(audio, language=language, fp16=False)
+        return {
+            'text': result['text'],
+            'segments': [{'start': s['start'], 'end': s['end'], 'text': s['text']} for s in result['segments']],
+        }
+
+# CTranslate2 기반 int8 양자화 CPU 백엔드
+class FasterWhisperEngine:
+    def __init__(self, model_size, compute_type="int8", cpu_threads=0):
+        from faster_whisper import WhisperModel
+        self.name = f"faster-whisper:{model_size}:{compute_type}"
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def transcribe(self, audio, language=None):
+        segments, _ = self.model.transcribe(audio, language=language, beam_size=5)
+        segments = [{'start': s.start, 'end': s.end, 'text': s.text} for s in segments]
+        return {
+            'text': "".join(s['text'] for s in segments),
+            'segments': segments,
+        }
+
+# 환경 변수를 반영한 (백엔드, 모델 크기)
+def resolve_config(default_model_size="small", backend=None):
+    return backend or os.getenv("ASR_BACKEND", "whisper"), os.getenv("ASR_MODEL_SIZE", default_model_size)
+
+# 설정으로 정해지는 엔진 이름 (엔진의 name 과 같음), 모델을 로드하지 않고 캐시 키를 만들 때 사용
+def engine_name(default_model_size="small", backend=None):
+    backend, model_size = resolve_config(default_model_size, backend)
+    if backend == "faster-whisper":
+        return f"{backend}:{model_size}:{os.getenv('ASR_COMPUTE_TYPE', 'int8')}"
+    return f"{backend}:{model_size}"
+
+# model 은 엔진 또는 엔진을 돌려주는 함수 (로드 중인 모델을 캐시에 없을 때만 기다리도록)
+def _engine(model):
+    return model() if callable(model) else model
+
+# 설정된 백엔드로 ASR 엔진 로드 (transcribe 결과 형태는 백엔드와 무관하게 동일)
+def load_engine(default_model_size="small", backend=None):
+    backend, model_size = resolve_config(default_model_size, backend)
+    if backend == "whisper":
+        return WhisperEngine(model_size)
+    if backend == "faster-whisper":
+        return FasterWhisperEngine(
+            model_size,
+            compute_type=os.getenv("ASR_COMPUTE_TYPE", "int8"),
+            cpu_threads=int(os.getenv("ASR_CPU_THREADS", "0")),
+        )
+    raise ValueError(f"Unknown ASR backend: {backend} (choose one of {', '.join(ASR_BACKENDS)})")
+
+# 모델 로드를 백그라운드 스레드에서 시작하고 Future 반환
+# UI 는 바로 그리고, 전사할 때 result() 로 로드가 끝나기를 기다림
+def load_in_background(load, *args):
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr-warmup")
+    future = executor.submit(load, *args)
+    executor.shutdown(wait=False)
+    return future
+
+# 스트리밍 전사 윈도우 설정 (환경 변수, 초 단위)
+#   ASR_STREAM_FIRST_CHUNK_SECONDS: 첫 윈도우 길이 (짧을수록 첫 중간 결과가 빨리 나옴)
+#   ASR_STREAM_CHUNK_SECONDS: 나머지 윈도우 길이
+#   ASR_STREAM_OVERLAP_SECONDS: 이웃 윈도우끼리 겹치는 길이
+STREAM_FIRST_CHUNK_SECONDS = float(os.getenv("ASR_STREAM_FIRST_CHUNK_SECONDS", "5"))
+STREAM_CHUNK_SECONDS = float(os.getenv("ASR_STREAM_CHUNK_SECONDS", "20"))
+STREAM_OVERLAP_SECONDS = float(os.getenv("ASR_STREAM_OVERLAP_SECONDS", "2"))
+
+# 녹음 바이트(webm/opus 등)를 임시 파일이나 ffmpeg 프로세스 없이 PyAV 로 바로
+# 16kHz mono float32 PCM 으로 디코딩
+def decode_audio_bytes(data, sr=SAMPLE_RATE):
+    import av
+    try:
+        with av.open(io.BytesIO(data)) as container:
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=sr)
+            chunks = []
+            for frame in container.decode(audio=0):
+                chunks.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(frame))
+            chunks.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(None))
+    except av.error.FFmpegError as e:
+        raise RuntimeError(f"Failed to load audio: {e}") from e
+    if not chunks:
+        return np.zeros(0, np.float32)
+    return np.concatenate(chunks).astype(np.float32) / 32768.0
+
+def load_pcm(audio):
+    if isinstance(audio, np.ndarray):
+        return audio
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            audio = f.read()
+    with metrics.timer("decode"):
+        return decode_audio_bytes(bytes(audio))
+
+# 겹치는(overlap) 윈도우로 PCM 을 잘라서 (시작 시간, 윈도우, 마지막 여부) 반환
+# 첫 윈도우만 first_chunk_seconds 길이로 짧게 잘라서 첫 중간 결과를 빨리 보여줌
+def iter_pcm_windows(audio, chunk_seconds=STREAM_CHUNK_SECONDS, overlap_seconds=STREAM_OVERLAP_SECONDS, sr=SAMPLE_RATE, first_chunk_seconds=STREAM_FIRST_CHUNK_SECONDS):
+    overlap = int(overlap_seconds * sr)
+    chunk = int((first_chunk_seconds or chunk_seconds) * sr)
+    start = 0
+    while start < len(audio):
+        end = min(start + chunk, len(audio))
+        is_last = end >= len(audio)
+        yield start / sr, audio[start:end], is_last
+        if is_last:
+            break
+        start = max(end - overlap, start + 1)
+        chunk = int(chunk_seconds * sr)
+
+def _norm_word(word):
+    return word.strip(".,!?;:\"'()[]").lower()
+
+# 이미 확정된 단어열의 끝과 새 단어열의 앞이 겹치면 겹친 부분을 버림
+def merge_overlap(committed, new_words, max_overlap=8):
+    limit = min(len(committed), len(new_words), max_overlap)
+    for k in range(limit, 0, -1):
+        if [_norm_word(w) for w in committed[-k:]] == [_norm_word(w) for w in new_words[:k]]:
+            return new_words[k:]
+    return new_words
+
+# 엔진이 submit 을 지원하면 (워커 풀) 모든 윈도우를 먼저 제출하고 순서대로 결과를 받음
+def _map_windows(model, windows, language):
+    if hasattr(model, "submit"):
+        futures = [(offset, window, is_last, model.submit(window, language)) for offset, window, is_last in windows]
+        for offset, window, is_last, future in futures:
+            yield offset, window, is_last, future.result()
+    else:
+        for offset, window, is_last in windows:
+            yield offset, window, is_last, model.transcribe(window, language=language)
+
+# 윈도우 단위로 Whisper 를 돌리면서 지금까지의 전체 텍스트를 계속 yield
+# VAD 를 켜면 무음 구간을 잘라낸 오디오만 전사
+# segments 에 리스트를 넘기면 원본 오디오 기준 시간의 세그먼트를 채워줌
+def transcribe_stream(model, audio, language='ko', chunk_seconds=STREAM_CHUNK_SECONDS, overlap_seconds=STREAM_OVERLAP_SECONDS, use_vad=vad.VAD_ENABLED, segments=None):
+    audio = load_pcm(audio)
+    segment_map = [(0, 0, len(audio))]
+    if use_vad:
+        with metrics.timer("vad"):
+            audio, segment_map = vad.trim_silence(audio, SAMPLE_RATE)
+    words = []
+    committed_until = 0.0
+
+    windows = iter_pcm_windows(audio, chunk_seconds, overlap_seconds)
+    for offset, window, is_last, result in _map_windows(model, windows, language):
+
+        # 다음 윈도우와 겹치는 구간의 뒷부분은 다음 윈도우에서 처리
+        cut = offset + len(window) / SAMPLE_RATE
+        if not is_last:
+            cut -= overlap_seconds / 2
+
+        texts = []
+        for seg in result['segments']:
+            start = offset + seg['start']
+            end = offset + seg['end']
+            if end <= committed_until or start >= cut:
+                continue
+            texts.append(seg['text'])
+            committed_until = max(committed_until, end)
+            if segments is not None:
+                segments.append({
+                    'start': vad.to_original_time(start, segment_map, SAMPLE_RATE),
+                    'end': vad.to_original_time(end, segment_map, SAMPLE_RATE),
+                    'text': seg['text'],
+                })
+
+        words.extend(merge_overlap(words, " ".join(texts).split()))
+        yield " ".join(words)
+
+# 긴 파일 전사 조각 최대 길이 (초, Whisper 입력 길이에 맞춤)
+LONGFORM_SEGMENT_SECONDS = float(os.getenv("ASR_LONGFORM_SEGMENT_SECONDS", "30"))
+
+# lo ~ hi 샘플 사이에서 가장 조용한 프레임 위치
+def _quietest_cut(audio, lo, hi, sr):
+    frame = int(sr * vad.VAD_FRAME_MS / 1000)
+    energy = vad.frame_energy_db(audio[lo:hi], frame)
+    if len(energy) == 0:
+        return hi
+    return lo + int(np.argmin(energy)) * frame
+
+# 긴 오디오를 무음 위치에서 max_seconds 이하 조각으로 나눔 [(시작 샘플, 끝 샘플)]
+# 가까운 음성 구간은 한 조각으로 묶고, 한 구간이 너무 길면 뒤쪽 절반에서 가장 조용한 곳을 자름
+def split_on_silence(audio, sr=SAMPLE_RATE, max_seconds=LONGFORM_SEGMENT_SECONDS):
+    limit = int(max_seconds * sr)
+    pieces = []
+    for start, end in vad.speech_regions(audio, sr):
+        while end - start > limit:
+            cut = max(_quietest_cut(audio, start + limit // 2, start + limit, sr), start + 1)
+            pieces.append([start, cut])
+            start = cut
+        if pieces and end - pieces[-1][0] <= limit:
+            pieces[-1][1] = end
+        else:
+            pieces.append([start, end])
+    return [(int(start), int(end)) for start, end in pieces]
+
+# 조각 결과를 (조각 번호, 결과) 로 끝나는 순서대로 반환 (워커 풀이면 모든 조각을 한 번에 제출)
+def _transcribe_pieces(model, audio, pieces, language):
+    if hasattr(model, "submit"):
+        futures = {model.submit(audio[start:end], language): i for i, (start, end) in enumerate(pieces)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    else:
+        for i, (start, end) in enumerate(pieces):
+            yield i, model.transcribe(audio[start:end], language=language)
+
+# 긴 오디오를 무음 기준으로 나눠서 조각별로 (병렬) 전사
+# 조각이 끝날 때마다 (끝난 조각 수, 전체 조각 수, 앞에서부터 이어지는 세그먼트 목록) 을 yield
+# 세그먼트 시간은 원본 오디오 기준
+def transcribe_long(model, audio, language='ko', max_seconds=LONGFORM_SEGMENT_SECONDS):
+    audio = load_pcm(audio)
+    pieces = split_on_silence(audio, SAMPLE_RATE, max_seconds)
+    results = [None] * len(pieces)
+    segments = []
+    next_piece = 0
+    if not pieces:
+        yield 0, 0, segments
+    for done, (i, result) in enumerate(_transcribe_pieces(model, audio, pieces, language), 1):
+        results[i] = result
+        # 순서대로 이어지는 조각까지만 세그먼트에 추가
+        while next_piece < len(pieces) and results[next_piece] is not None:
+            offset = pieces[next_piece][0] / SAMPLE_RATE
+            for seg in results[next_piece]['segments']:
+                segments.append({'start': offset + seg['start'], 'end': offset + seg['end'], 'text': seg['text']})
+            results[next_piece] = True
+            next_piece += 1
+        yield done, len(pieces), segments
+
+def segments_text(segments):
+    return " ".join(seg['text'].strip() for seg in segments if seg['text'].strip())
+
+# 긴 오디오 파일 전사 → {'text', 'segments'}, 진행 상황은 on_progress(끝난 조각 수, 전체 조각 수, 지금까지의 텍스트)
+def transcribe_file(model, audio_data, language='ko', cache=None, on_progress=None, model_name=None):
+    if cache is not None:
+        cache_key = caches.content_key(audio_data, model_name or model.name, language, 'longform', LONGFORM_SEGMENT_SECONDS)
+        result = cache.get_json(cache_key)
+        if result is not None:
+            if on_progress:
+                on_progress(1, 1, result['text'])
+            return result
+
+    model = _engine(model)
+    segments = []
+    with metrics.timer("transcribe_long"):
+        for done, total, segments in transcribe_long(model, audio_data, language=language):
+            if on_progress:
+                on_progress(done, total, segments_text(segments))
+    result = {'text': segments_text(segments), 'segments': segments}
+    if cache is not None:
+        cache.set_json(cache_key, result)
+    return result
+
+# 녹음을 윈도우 단위로 전사하면서 중간 결과를 on_partial 로 전달
+# segments 에 리스트를 넘기면 타임스탬프가 있는 세그먼트도 채워줌 (자막용)
+def transcribe_audio(model, audio_data, language='ko', cache=None, on_partial=None, segments=None, model_name=None):
+    # 같은 오디오를 같은 모델/언어로 전사한 적이 있으면 캐시에서 바로 반환
+    if cache is not None:
+        cache_key = caches.content_key(audio_data, model_name or model.name, language, 'vad' if vad.VAD_ENABLED else 'full', 'segments')
+        result = cache.get_json(cache_key)
+        if result is not None:
+            if segments is not None:
+                segments.extend(result['segments'])
+            if on_partial:
+                on_partial(result['text'])
+            return result['text']
+
+    model = _engine(model)
+    text = ""
+    found = []
+    with metrics.timer("transcribe"):
+        for text in transcribe_stream(model, audio_data, language=language, segments=found):
+            if on_partial:
+                on_partial(text)
+    if segments is not None:
+        segments.extend(found)
+    if cache is not None:
+        cache.set_json(cache_key, {'text': text, 'segments': found})
+    return text
@@ -0,0 +1,72 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import asr
+
+# ASR 워커 프로세스 풀 설정 (환경 변수)
+#   ASR_WORKERS: 워커 프로세스 수 (0 이면 풀 없이 스크립트 스레드에서 직접 실행)
+#   ASR_WORKER_THREADS: 워커 하나가 사용할 torch / CTranslate2 스레드 수
+DEFAULT_WORKERS = 2
+
+# 워커 프로세스마다 하나씩 로드되는 엔진
+_engine = None
+# 준비 확인용 배리어 (워커 수만큼 모여야 풀림)
+_ready_barrier = None
+
+def _init_worker(default_model_size, backend, threads, ready_barrier):
+    global _engine, _ready_barrier
+    _ready_barrier = ready_barrier
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ.setdefault("ASR_CPU_THREADS", str(threads))
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _engine = asr.load_engine(default_model_size, backend=backend)
+
+def _transcribe_job(audio, language):
+    return _engine.transcribe(audio, language=language)
+
+# 엔진 로드가 끝난 워커가 하나씩 받는 빈 작업
+# 모든 워커가 하나씩 받을 때까지 기다려서, 한 워커가 여러 개를 처리하고 끝나지 않게 함
+def _ready_job():
+    _ready_barrier.wait()
+
+# 세션들이 공유하는 ASR 워커 풀 (엔진과 같은 transcribe 인터페이스 + submit)
+class ASRPool:
+    def __init__(self, default_model_size="small", workers=None, threads=None, backend=None):
+        backend, _ = asr.resolve_config(default_model_size, backend)
+        self.name = asr.engine_name(default_model_size, backend)
+        self.workers = workers or int(os.getenv("ASR_WORKERS", str(DEFAULT_WORKERS)))
+        self.threads = threads or int(os.getenv("ASR_WORKER_THREADS", str(max(1, (os.cpu_count() or 1) // self.workers))))
+        context = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(default_model_size, backend, self.threads, context.Barrier(self.workers)),
+        )
+
+    # 워커 프로세스는 첫 작업이 들어올 때 생기므로, 워커마다 빈 작업을 보내서
+    # 모든 워커가 엔진 로드를 마칠 때까지 기다림
+    def warm_up(self):
+        for future in [self.executor.submit(_ready_job) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, audio, language=None):
+        return self.executor.submit(_transcribe_job, audio, language)
+
+    def transcribe(self, audio, language=None):
+        return self.submit(audio, language).result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# ASR_WORKERS 설정에 따라 워커 풀 또는 인라인 엔진 반환
+def load_pooled_engine(default_model_size="small", backend=None):
+    if int(os.getenv("ASR_WORKERS", str(DEFAULT_WORKERS))) <= 0:
+        return asr.load_engine(default_model_size, backend=backend)
+    pool = ASRPool(default_model_size, backend=backend)
+    pool.warm_up()
+    return pool
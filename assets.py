@@ -0,0 +1,47 @@
+import os
+import io
+import base64
+import hashlib
+import streamlit as st
+
+# 배경 이미지는 축소/압축한 버전을 한 번만 만들어 두고 재사용
+BACKGROUND_MAX_WIDTH = 1920
+BACKGROUND_QUALITY = 80
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+def _compress_image(img_file, max_width=BACKGROUND_MAX_WIDTH, quality=BACKGROUND_QUALITY):
+    with open(img_file, 'rb') as f:
+        original = f.read()
+    try:
+        from PIL import Image
+    except ImportError:
+        return original
+    with Image.open(io.BytesIO(original)) as im:
+        im = im.convert("RGB")
+        if im.width > max_width:
+            im = im.resize((max_width, round(im.height * max_width / im.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        im.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    # 다시 저장한 게 더 크면 원본 사용
+    return min(buffer.getvalue(), original, key=len)
+
+# 파일 수정 시간이 바뀌기 전까지는 rerun 마다 다시 읽거나 인코딩하지 않음
+@st.cache_data(show_spinner=False)
+def _background_url(img_file, mtime, use_static):
+    data = _compress_image(img_file)
+    if use_static:
+        # 내용 해시를 파일 이름에 넣어서 브라우저 캐시를 그대로 쓸 수 있게 함
+        name = f"background_{hashlib.sha1(data).hexdigest()[:12]}.jpg"
+        path = os.path.join(STATIC_DIR, name)
+        if not os.path.exists(path):
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        return f"app/static/{name}"
+    return "data:image/jpeg;base64," + base64.b64encode(data).decode()
+
+# CSS 에 넣을 배경 이미지 URL
+# 정적 파일 서빙이 켜져 있으면 static/ 경로, 아니면 (압축된) data URL
+def background_image_url(img_file):
+    use_static = bool(st.get_option("server.enableStaticServing"))
+    return _background_url(img_file, os.path.getmtime(img_file), use_static)
@@ -0,0 +1,71 @@
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+# 스레드 하나에 쌓을 수 있는 최대 메시지 수, 넘으면 새 스레드로 교체
+THREAD_MESSAGE_BUDGET = int(os.getenv("THREAD_MESSAGE_BUDGET", "20"))
+
+# 세션들이 나눠 쓰는 Assistants 스레드 풀
+# 다 쓴 스레드는 백그라운드에서 메시지를 지운 뒤 다시 풀에 넣음
+class AssistantThreadPool:
+    def __init__(self, client, cleanup, message_budget=THREAD_MESSAGE_BUDGET):
+        self.client = client
+        self.cleanup = cleanup
+        self.message_budget = message_budget
+        self.idle = []
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return self.client.beta.threads.create().id
+
+    def release(self, thread_id):
+        try:
+            self.executor.submit(self._recycle, thread_id)
+        except RuntimeError:
+            # 인터프리터 종료 중이라 executor 가 닫혔으면 반납하지 않음 (다시 쓸 일이 없음)
+            pass
+
+    def _recycle(self, thread_id):
+        try:
+            self.cleanup(thread_id)
+        except Exception:
+            # 정리에 실패한 스레드는 다시 쓰지 않음
+            return
+        with self.lock:
+            self.idle.append(thread_id)
+
+    def lease(self):
+        return ThreadLease(self)
+
+def _release_lease(pool, state):
+    if state['thread_id'] is not None:
+        pool.release(state['thread_id'])
+
+# 한 세션이 쓰는 스레드, 세션이 끝나서 객체가 사라지면 스레드를 풀에 반납
+class ThreadLease:
+    def __init__(self, pool):
+        self.pool = pool
+        self.state = {'thread_id': None, 'messages': 0}
+        finalizer = weakref.finalize(self, _release_lease, pool, self.state)
+        # 인터프리터 종료 시에는 반납하지 않음 (executor 가 이미 닫혀 있음)
+        finalizer.atexit = False
+
+    @property
+    def thread_id(self):
+        if self.state['thread_id'] is None:
+            self.state['thread_id'] = self.pool.acquire()
+        return self.state['thread_id']
+
+    # run 하나가 끝날 때마다 호출 (사용자 메시지 + 응답 메시지)
+    def record_run(self, messages=2):
+        self.state['messages'] += messages
+        if self.state['messages'] >= self.pool.message_budget:
+            old_thread_id = self.state['thread_id']
+            self.state['thread_id'] = None
+            self.state['messages'] = 0
+            self.pool.release(old_thread_id)
@@ -0,0 +1,42 @@
+import io
+import hashlib
+from pydub import AudioSegment
+import metrics
+
+# 병합 트랙을 만들 때 모든 조각을 같은 형식으로 맞춤 (그래야 mp3 프레임을 그대로 이어붙일 수 있음)
+MERGE_FRAME_RATE = 24000
+MERGE_BITRATE = "64k"
+
+# Xing/ID3 헤더 없이 내보내야 이어붙인 파일 전체 길이를 플레이어가 제대로 인식함
+_EXPORT_PARAMETERS = ["-write_xing", "0", "-id3v2_version", "0"]
+
+# 녹음별 TTS 음성을 (음성 + 무음) mp3 조각으로 한 번만 인코딩해 두고,
+# 녹음이 추가/삭제/순서 변경되면 조각만 다시 이어붙여서 병합 트랙을 만듦
+class MergedTrack:
+    def __init__(self, silence_duration=700):
+        self.silence_duration = silence_duration
+        self.chunks = {}
+
+    def build(self, audio_files):
+        with metrics.timer("merge"):
+            return self._build(audio_files)
+
+    def _build(self, audio_files):
+        keys = [hashlib.sha1(audio_file).hexdigest() for audio_file in audio_files]
+        for key, audio_file in zip(keys, audio_files):
+            if key not in self.chunks:
+                self.chunks[key] = self._encode(audio_file)
+
+        # 더 이상 없는 녹음의 조각은 버림
+        for key in set(self.chunks) - set(keys):
+            del self.chunks[key]
+
+        return b"".join(self.chunks[key] for key in keys)
+
+    def _encode(self, audio_file):
+        segment = AudioSegment.from_file(io.BytesIO(audio_file), format="mp3")
+        segment = segment.set_frame_rate(MERGE_FRAME_RATE).set_channels(1)
+        segment += AudioSegment.silent(duration=self.silence_duration, frame_rate=MERGE_FRAME_RATE)
+        buffer = io.BytesIO()
+        segment.export(buffer, format="mp3", bitrate=MERGE_BITRATE, parameters=_EXPORT_PARAMETERS)
+        return buffer.getvalue()
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asr
+import asr_pool
+import caches
+import tts
+import openai_client
+import metrics
+import subtitles
+from translation import translator_call, translate_batch
+
+# 폴더 안의 오디오 파일을 UI 없이 전사 → 번역 → (선택) TTS 까지 처리하는 배치 스크립트
+#   python batch.py lectures/ --language English --output lectures.jsonl --tts-dir lectures_tts/
+# 중간에 멈춰도 manifest 에 완료 기록이 남아 있어서 다시 실행하면 이어서 처리함
+
+AUDIO_EXTENSIONS = ('.webm', '.wav', '.mp3', '.m4a', '.ogg', '.flac', '.mp4')
+
+# 처리 완료된 파일 기록 (파일 내용 해시 기준), 매번 원자적으로 다시 씀
+class Manifest:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = json.load(f)
+
+    def is_done(self, digest):
+        return digest in self.done
+
+    def mark_done(self, digest, file_path):
+        with self.lock:
+            self.done[digest] = file_path
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.done, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+def find_audio_files(input_dir):
+    files = []
+    for root, _, names in os.walk(input_dir):
+        for name in sorted(names):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe and translate a folder of audio files.")
+    parser.add_argument("input_dir")
+    parser.add_argument("--output", default="batch_output.jsonl", help="JSONL file the results are appended to")
+    parser.add_argument("--manifest", help="progress manifest (default: <output>.manifest.json)")
+    parser.add_argument("--source-language", default="ko")
+    parser.add_argument("--language", default="English", help="translation target language")
+    parser.add_argument("--tone", default="Default")
+    parser.add_argument("--model-size", default="small")
+    parser.add_argument("--asr-workers", type=int, default=os.cpu_count() or 1, help="ASR worker processes")
+    parser.add_argument("--concurrency", type=int, default=4, help="files processed at the same time")
+    parser.add_argument("--requests-per-minute", type=int, default=60, help="OpenAI request rate limit")
+    parser.add_argument("--tts-dir", help="write translated speech mp3 files here")
+    parser.add_argument("--subtitles-dir", help="write original and translated SRT subtitles here")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.getenv('OPENAI_API_KEY'):
+        raise ValueError("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
+
+    # 동시 요청 수와 분당 요청 수 제한은 공유 클라이언트의 transport 에서 처리
+    client = openai_client.get_client(max_concurrency=args.concurrency, requests_per_minute=args.requests_per_minute)
+    engine = asr_pool.ASRPool(args.model_size, workers=args.asr_workers)
+    transcription_cache = caches.transcription_cache()
+    tts_cache = caches.tts_cache()
+    manifest = Manifest(args.manifest or args.output + ".manifest.json")
+    output_lock = threading.Lock()
+    if args.tts_dir:
+        os.makedirs(args.tts_dir, exist_ok=True)
+    if args.subtitles_dir:
+        os.makedirs(args.subtitles_dir, exist_ok=True)
+
+    def process(file_path):
+        with open(file_path, 'rb') as f:
+            audio_data = f.read()
+        digest = hashlib.sha256(audio_data).hexdigest()
+        if manifest.is_done(digest):
+            return False
+
+        with metrics.request("batch_file"):
+            return _process(file_path, audio_data, digest)
+
+    def _process(file_path, audio_data, digest):
+        segments = []
+        transcription = asr.transcribe_audio(engine, audio_data, language=args.source_language, cache=transcription_cache, segments=segments)
+        translation = translator_call(client, transcription, args.language, args.tone)
+        record = {
+            "file": file_path,
+            "sha256": digest,
+            "transcription": transcription,
+            "language": args.language,
+            "translation": translation,
+        }
+        if args.tts_dir:
+            audio_bytes = tts.text_to_speech(client, translation, cache=tts_cache)
+            tts_path = os.path.join(args.tts_dir, os.path.splitext(os.path.basename(file_path))[0] + f"_{digest[:8]}.mp3")
+            with open(tts_path, 'wb') as f:
+                f.write(audio_bytes)
+            record["tts"] = tts_path
+        if args.subtitles_dir:
+            # 전사할 때 나온 세그먼트 시간을 그대로 써서 원문 / 번역 자막 저장
+            table = subtitles.SegmentTable.from_segments(segments)
+            translated = subtitles.translate_table(table, lambda texts: translate_batch(client, texts, args.language, args.tone))
+            base = os.path.join(args.subtitles_dir, os.path.splitext(os.path.basename(file_path))[0] + f"_{digest[:8]}")
+            for path, srt in ((base + ".srt", subtitles.to_srt(table)), (base + f".{args.language}.srt", subtitles.to_srt(translated))):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(srt)
+            record["subtitles"] = [base + ".srt", base + f".{args.language}.srt"]
+        with output_lock:
+            with open(args.output, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        manifest.mark_done(digest, file_path)
+        return True
+
+    files = find_audio_files(args.input_dir)
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = {executor.submit(process, file_path): file_path for file_path in files}
+            for n, future in enumerate(as_completed(futures), 1):
+                try:
+                    status = "done" if future.result() else "already done"
+                except Exception as e:
+                    failed += 1
+                    status = f"failed: {e}"
+                print(f"[{n}/{len(files)}] {futures[future]} {status}", file=sys.stderr)
+    finally:
+        engine.shutdown()
+    # 단계별 지연 시간 요약 (ms)
+    for stage, stats in metrics.REGISTRY.summary().items():
+        print(f"{stage}: n={stats['count']} p50={stats['p50'] * 1000:.0f}ms p95={stats['p95'] * 1000:.0f}ms", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+import os
+import io
+import re
+import sys
+import json
+import time
+import wave
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import asr
+import metrics
+import tts
+import openai_client
+import assistant_threads
+import subtitles
+from translation import translator_call, gpt_call, translate_batch
+
+# 전사 → 번역 → TTS → 병합 파이프라인 벤치마크 (네트워크 / GPU 없이 실행)
+#   python bench.py --clips 5,15,30,60 --repeat 3 --latency 0.2 --json bench.json
+# OpenAI API 는 로컬 스텁 서버가 흉내내고 (지연 시간 설정 가능), 오디오는 합성한 클립을 씀
+# 단계별 처리량, p50/p95 지연 시간, 최대 RSS 를 출력
+
+SAMPLE_RATE = asr.SAMPLE_RATE
+
+# 말소리 비슷한 구간(배음 + 진폭 변조 + 잡음)과 무음 구간이 번갈아 나오는 16kHz mono WAV
+def make_clip(seconds, seed=0, speech_seconds=1.5, pause_seconds=0.5):
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    period = speech_seconds + pause_seconds
+    speaking = (t % period) < speech_seconds
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    audio = np.where(speaking, 0.3 * voice, 0.0) + 0.003 * rng.standard_normal(n)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+# 오디오 길이에 비례하는 시간(rtf) 동안 계산하는 척하고 2초마다 세그먼트를 만드는 ASR 엔진
+class SyntheticEngine:
+    def __init__(self, rtf=0.02):
+        self.rtf = rtf
+        self.name = f"synthetic:{rtf:g}"
+
+    def transcribe(self, audio, language=None):
+        duration = len(audio) / SAMPLE_RATE
+        time.sleep(duration * self.rtf)
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(start + 2.0, duration)
+            segments.append({'start': start, 'end': end, 'text': f" 문장 {int(start // 2) + 1} 번째 발표 내용입니다."})
+            start = end
+        return {'text': "".join(s['text'] for s in segments), 'segments': segments}
+
+# 텍스트 길이에 맞는 길이의 mp3 (PyAV 로 인코딩, 길이별로 한 번만 만듦)
+_mp3_cache = {}
+_mp3_lock = threading.Lock()
+
+def synth_mp3(seconds, rate=24000):
+    seconds = max(0.5, round(seconds * 2) / 2)
+    with _mp3_lock:
+        if seconds not in _mp3_cache:
+            import av
+            buffer = io.BytesIO()
+            with av.open(buffer, 'w', format='mp3') as container:
+                stream = container.add_stream('mp3', rate=rate, layout='mono')
+                t = np.arange(int(seconds * rate)) / rate
+                frame = av.AudioFrame.from_ndarray((np.sin(2 * np.pi * 220 * t) * 6000).astype(np.int16).reshape(1, -1), format='s16', layout='mono')
+                frame.sample_rate = rate
+                for packet in stream.encode(frame):
+                    container.mux(packet)
+                for packet in stream.encode(None):
+                    container.mux(packet)
+            _mp3_cache[seconds] = buffer.getvalue()
+        return _mp3_cache[seconds]
+
+# OpenAI 호환 스텁 서버 (chat completions, audio speech, Assistants threads / runs)
+# latency: 첫 응답까지 지연, token_delay: 스트리밍 조각 사이 지연
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    token_delay = 0.005
+    _ids = iter(range(1, 1 << 62))
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _send(self, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _event(self, data, event=None):
+        text = (f"event: {event}\n" if event else "") + "data: " + (data if isinstance(data, str) else json.dumps(data)) + "\n\n"
+        self._chunk(text.encode("utf-8"))
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _new_id(self, prefix):
+        return f"{prefix}_{next(self._ids)}"
+
+    def do_GET(self):
+        if re.fullmatch(r"/v1/threads/[^/]+/messages", self.path.split("?")[0]):
+            return self._send({"object": "list", "data": [], "first_id": None, "last_id": None, "has_more": False})
+        self.send_error(404)
+
+    def do_DELETE(self):
+        self._send({"id": self.path.rsplit("/", 1)[-1], "deleted": True, "object": "thread.message.deleted"})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self._body()
+        time.sleep(self.latency)
+        if path == "/v1/chat/completions":
+            return self._chat(body)
+        if path == "/v1/audio/speech":
+            return self._send(synth_mp3(len(body.get("input", "")) * 0.06), "audio/mpeg")
+        if path == "/v1/threads":
+            return self._send({"id": self._new_id("thread"), "object": "thread", "created_at": int(time.time()), "metadata": {}})
+        match = re.fullmatch(r"/v1/threads/([^/]+)/messages", path)
+        if match:
+            return self._send(self._message(match.group(1), body.get("content", ""), role="user", status="completed"))
+        match = re.fullmatch(r"/v1/threads/([^/]+)/runs", path)
+        if match:
+            return self._run(match.group(1), body)
+        match = re.fullmatch(r"/v1/threads/([^/]+)/runs/([^/]+)/cancel", path)
+        if match:
+            return self._send(self._run_object(match.group(1), match.group(2), body, "cancelled"))
+        self.send_error(404)
+
+    # 입력 텍스트를 그대로 "번역" 결과로 돌려줌 (스트리밍이 아니면 줄바꿈도 그대로)
+    def _chat(self, body):
+        text = str(next((m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), ""))
+        words = [word + " " for word in text.split()] or ["."]
+        chunk_id = self._new_id("chatcmpl")
+        if not body.get("stream"):
+            time.sleep(self.token_delay * len(words))
+            return self._send({
+                "id": chunk_id, "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            })
+        self._start_stream()
+        for word in words:
+            self._event({
+                "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model"),
+                "choices": [{"index": 0, "finish_reason": None, "delta": {"content": word}}],
+            })
+            time.sleep(self.token_delay)
+        self._event({
+            "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "delta": {}}],
+        })
+        self._event("[DONE]")
+        self._end_stream()
+
+    def _message(self, thread_id, text, role="assistant", status="in_progress", message_id=None):
+        content = [{"type": "text", "text": {"value": text, "annotations": []}}] if text else []
+        return {
+            "id": message_id or self._new_id("msg"), "object": "thread.message", "created_at": int(time.time()),
+            "thread_id": thread_id, "role": role, "status": status, "content": content, "attachments": [], "metadata": {},
+        }
+
+    def _run_object(self, thread_id, run_id, body, status):
+        return {
+            "id": run_id, "object": "thread.run", "created_at": int(time.time()), "thread_id": thread_id,
+            "assistant_id": body.get("assistant_id", "asst_stub"), "status": status, "model": "stub",
+            "instructions": body.get("instructions", ""), "tools": [], "metadata": {}, "parallel_tool_calls": True,
+        }
+
+    # Assistants 스트리밍 run: run.created → message.created → message.delta* → message.completed → run.completed
+    def _run(self, thread_id, body):
+        run_id = self._new_id("run")
+        message_id = self._new_id("msg")
+        instructions = body.get("instructions", "")
+        words = [word + " " for word in instructions.split()[:40]] or ["."]
+        self._start_stream()
+        self._event(self._run_object(thread_id, run_id, body, "queued"), "thread.run.created")
+        self._event(self._run_object(thread_id, run_id, body, "in_progress"), "thread.run.in_progress")
+        self._event(self._message(thread_id, "", message_id=message_id), "thread.message.created")
+        for word in words:
+            self._event({
+                "id": message_id, "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": word, "annotations": []}}]},
+            }, "thread.message.delta")
+            time.sleep(self.token_delay)
+        self._event(self._message(thread_id, "".join(words), status="completed", message_id=message_id), "thread.message.completed")
+        self._event(self._run_object(thread_id, run_id, body, "completed"), "thread.run.completed")
+        self._event("[DONE]", "done")
+        self._end_stream()
+
+# 클라이언트가 스트림을 끝까지 읽지 않고 연결을 닫는 경우는 에러로 출력하지 않음
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+# 백그라운드 스레드에서 스텁 서버 시작, base URL 반환
+def start_stub_server(latency, token_delay):
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"latency": latency, "token_delay": token_delay})
+    server = StubServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="openai-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+# 현재 RSS (바이트), /proc 이 없으면 지금까지의 최대 RSS
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+        except ImportError:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+# 단계 실행 중 RSS 를 주기적으로 재서 최댓값 기록
+class RssSampler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = current_rss()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0.0
+
+# items 를 concurrency 개씩 동시에 처리하면서 항목별 지연 시간, 처리량, 최대 RSS 측정
+def run_stage(name, fn, items, concurrency):
+    latencies = []
+
+    def timed(item):
+        start = time.perf_counter()
+        result = fn(item)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed, items))
+        wall = time.perf_counter() - start
+    return results, {
+        "stage": name,
+        "n": len(items),
+        "wall_s": wall,
+        "throughput_per_s": len(items) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "peak_rss_mb": rss.peak / (1024 * 1024),
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the transcribe -> translate -> TTS -> merge pipeline offline.")
+    parser.add_argument("--clips", default="5,15,30,60", help="comma separated clip lengths in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="times each clip goes through the pipeline")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel requests for the API stages")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub server delay before each response (s)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="stub server delay between streamed chunks (s)")
+    parser.add_argument("--asr-backend", default="synthetic", choices=("synthetic",) + asr.ASR_BACKENDS, help="real backends need locally cached model weights")
+    parser.add_argument("--asr-rtf", type=float, default=0.02, help="real-time factor of the synthetic ASR engine")
+    parser.add_argument("--model-size", default="tiny")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results here as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    server, base_url = start_stub_server(args.latency, args.token_delay)
+    # 공유 클라이언트가 스텁 서버로 가도록 만들기 전에 환경 변수 설정
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "bench"
+    client = openai_client.get_client(max_concurrency=args.concurrency)
+
+    if args.asr_backend == "synthetic":
+        engine = SyntheticEngine(args.asr_rtf)
+    else:
+        engine = asr.load_engine(args.model_size, backend=args.asr_backend)
+
+    lengths = [float(s) for s in args.clips.split(",") if s.strip()]
+    clips = [make_clip(seconds, seed=args.seed + i) for i, seconds in enumerate(lengths)] * args.repeat
+    thread_pool = assistant_threads.AssistantThreadPool(client, lambda thread_id: None)
+
+    # SDK 가 처음 호출할 때 하는 초기화(리소스 / 응답 모델 생성)는 측정에서 뺌
+    translator_call(client, "warm up", "English", "Default")
+    gpt_call(client, "warm up", "English", "Default", thread_pool.lease())
+    tts.text_to_speech(client, "warm up")
+    metrics.REGISTRY.reset()
+
+    rows = []
+    # ASR 는 CPU 를 쓰므로 한 번에 하나씩
+    def transcribe(clip):
+        segments = []
+        text = asr.transcribe_audio(engine, clip, language='ko', segments=segments)
+        return text, subtitles.SegmentTable.from_segments(segments)
+
+    results, row = run_stage("transcribe_audio", transcribe, clips, 1)
+    transcriptions = [text for text, _ in results]
+    tables = [table for _, table in results]
+    rows.append(row)
+    translations, row = run_stage("translator_call", lambda text: translator_call(client, text, "English", "Default"), transcriptions, args.concurrency)
+    rows.append(row)
+    _, row = run_stage("gpt_call", lambda text: gpt_call(client, text, "English", "Default", thread_pool.lease()), transcriptions, args.concurrency)
+    rows.append(row)
+    # 세그먼트를 묶음 단위로 번역해서 번역 자막 생성
+    _, row = run_stage("subtitles", lambda table: subtitles.to_srt(subtitles.translate_table(table, lambda texts: translate_batch(client, texts, "English", "Default"))), tables, 1)
+    rows.append(row)
+    tts_audios, row = run_stage("text_to_speech", lambda text: tts.text_to_speech(client, text), translations, args.concurrency)
+    rows.append(row)
+    try:
+        import audio_merge
+        # 녹음 수가 늘어나는 순서대로 병합 (앱에서 "Listen to all" 을 누를 때와 같은 증분 병합)
+        track = audio_merge.MergedTrack(700)
+        _, row = run_stage("merge_audios_with_silence", lambda n: track.build(tts_audios[:n]), list(range(1, len(tts_audios) + 1)), 1)
+        rows.append(row)
+    except (ImportError, FileNotFoundError) as e:
+        print(f"merge stage skipped (pydub/ffmpeg not available: {e})", file=sys.stderr)
+    server.shutdown()
+
+    print(f"{'stage':<28}{'n':>5}{'items/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak RSS MB':>13}")
+    for row in rows:
+        print(f"{row['stage']:<28}{row['n']:>5}{row['throughput_per_s']:>10.2f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['peak_rss_mb']:>13.1f}")
+
+    # metrics 모듈이 기록한 세부 단계 (decode, vad, 첫 토큰까지 시간 등)
+    detail = metrics.REGISTRY.summary()
+    print()
+    print(f"{'instrumented stage':<28}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage, stats in detail.items():
+        print(f"{stage:<28}{stats['count']:>5}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "stages": rows, "instrumented": detail}, f, ensure_ascii=False, indent=1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
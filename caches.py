@@ -0,0 +1,158 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# 캐시 파일 위치 (CACHE_DIR 환경 변수로 변경 가능)
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "audio_translator"))
+
+# 바이트 내용 + 부가 정보(모델, 언어 등)로 캐시 키 생성
+def content_key(data, *parts):
+    digest = hashlib.sha256(data).hexdigest()
+    return "|".join([digest] + [str(p) for p in parts])
+
+# SQLite 기반 디스크 캐시, 전체 크기가 max_bytes 를 넘으면 오래 안 쓴 항목부터 삭제 (LRU)
+class DiskCache:
+    def __init__(self, name, max_bytes, cache_dir=CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"{name}.sqlite3")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, size INTEGER, accessed REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def set(self, key, value):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+            self._evict()
+
+    def get_json(self, key):
+        value = self.get(key)
+        return None if value is None else json.loads(value)
+
+    def set_json(self, key, value):
+        self.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+# 계산하던 세션이 중간에 멈췄다는 표시 (기다리던 세션이 직접 다시 계산)
+_ABANDONED = object()
+
+# 메모리 캐시 (TTL + 최대 항목 수), 같은 키를 동시에 요청하면 한 번만 계산하고 결과를 공유
+class MemoryCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self.lock:
+                value = self._get(key)
+                if value is not None:
+                    return value
+                future = self.inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = Future()
+                    self.inflight[key] = future
+            if owner:
+                break
+
+            # 이미 다른 세션이 같은 요청을 보내는 중이면 그 결과를 기다림
+            # 그 세션이 중간에 멈췄으면 (rerun 등) 처음부터 다시 시도해서 직접 계산
+            value = future.result()
+            if value is not _ABANDONED:
+                return value
+
+        try:
+            value = compute()
+        except Exception as e:
+            with self.lock:
+                del self.inflight[key]
+            future.set_exception(e)
+            raise
+        except BaseException:
+            # Streamlit 의 rerun / stop 처럼 이 세션에만 해당하는 예외는 기다리던 세션에 넘기지 않음
+            with self.lock:
+                del self.inflight[key]
+            future.set_result(_ABANDONED)
+            raise
+
+        self.set(key, value)
+        with self.lock:
+            del self.inflight[key]
+        future.set_result(value)
+        return value
+
+# 번역 캐시 키 (공백 정규화한 텍스트 + 언어 + 톤 + 모델 + RAG 여부)
+def translation_key(text, language, tone, model, use_rag):
+    return (" ".join(text.split()), language, tone, model, bool(use_rag))
+
+def translation_cache():
+    return MemoryCache(
+        int(os.getenv("TRANSLATION_CACHE_SIZE", "512")),
+        float(os.getenv("TRANSLATION_CACHE_TTL", "3600"))
+    )
+
+# TTS 음성 캐시 (텍스트 해시 + 음성 + 모델 + 포맷)
+def tts_key(text, voice, model, response_format):
+    return content_key(text.encode("utf-8"), voice, model, response_format)
+
+def tts_cache():
+    return DiskCache("tts", int(os.getenv("TTS_CACHE_MB", "256")) * 1024 * 1024)
+
+# 전사 결과 캐시 (오디오 해시 + 모델 + 언어)
+def transcription_cache():
+    return DiskCache("transcriptions", int(os.getenv("TRANSCRIPTION_CACHE_MB", "64")) * 1024 * 1024)
@@ -0,0 +1,171 @@
+import os
+import io
+import re
+import json
+import hashlib
+import threading
+import numpy as np
+import caches
+
+# 로컬 벡터 인덱스 RAG 설정 (환경 변수)
+#   LOCAL_RAG_EMBEDDING_MODEL: OpenAI 임베딩 모델
+#   LOCAL_RAG_TOP_K: 번역할 때 같이 넣을 문단 수
+LOCAL_RAG_EMBEDDING_MODEL = os.getenv("LOCAL_RAG_EMBEDDING_MODEL", "text-embedding-3-small")
+LOCAL_RAG_TOP_K = int(os.getenv("LOCAL_RAG_TOP_K", "4"))
+CHUNK_CHARS = 800
+CHUNK_OVERLAP = 100
+
+# 업로드 파일에서 텍스트 추출 (docx / pdf / pptx 는 해당 라이브러리 필요)
+def extract_text(name, data):
+    ext = os.path.splitext(name)[1].lower()
+    if ext == '.txt':
+        return data.decode('utf-8', errors='ignore')
+    if ext == '.docx':
+        import docx
+        document = docx.Document(io.BytesIO(data))
+        return "\n".join(p.text for p in document.paragraphs)
+    if ext == '.pdf':
+        from pypdf import PdfReader
+        return "\n".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages)
+    if ext == '.pptx':
+        from pptx import Presentation
+        texts = []
+        for slide in Presentation(io.BytesIO(data)).slides:
+            for shape in slide.shapes:
+                if shape.has_text_frame:
+                    texts.append(shape.text_frame.text)
+        return "\n".join(texts)
+    raise ValueError(f"Unsupported file type for local RAG: {name}")
+
+# 공백 기준으로 끊어서 CHUNK_CHARS 크기, CHUNK_OVERLAP 만큼 겹치는 조각으로 나눔
+def chunk_text(text, chunk_chars=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    text = re.sub(r'\s+', ' ', text).strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            space = text.rfind(' ', start + chunk_chars // 2, end)
+            if space != -1:
+                end = space
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [c for c in chunks if c]
+
+# OpenAI 임베딩
+class OpenAIEmbedder:
+    def __init__(self, client, model=LOCAL_RAG_EMBEDDING_MODEL):
+        self.client = client
+        self.name = model
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(model=self.name, input=texts)
+        return np.array([d.embedding for d in response.data], dtype=np.float32)
+
+# 네트워크 없이 테스트할 때 쓰는 해싱 임베딩 (단어 해시 → 고정 차원 벡터)
+class HashingEmbedder:
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r'\w+', text.lower()):
+                h = int.from_bytes(hashlib.md5(word.encode('utf-8')).digest()[:4], 'little')
+                vectors[row, h % self.dim] += 1.0 if h & (1 << 31) else -1.0
+        return vectors
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+# 정규화된 임베딩을 memory-mapped float32 행렬로 디스크에 두고, 내적(코사인) top-k 검색
+# 조각 메타데이터(문서 해시, 파일 이름, 텍스트)는 chunks.jsonl 에 같은 순서로 저장
+class LocalIndex:
+    def __init__(self, embedder, index_dir=None):
+        self.embedder = embedder
+        self.dir = index_dir or os.path.join(caches.CACHE_DIR, "local_rag", re.sub(r'\W', '_', embedder.name))
+        os.makedirs(self.dir, exist_ok=True)
+        self.matrix_path = os.path.join(self.dir, "embeddings.f32")
+        self.chunks_path = os.path.join(self.dir, "chunks.jsonl")
+        self.lock = threading.Lock()
+        self.chunks = []
+        if os.path.exists(self.chunks_path):
+            with open(self.chunks_path, encoding='utf-8') as f:
+                self.chunks = [json.loads(line) for line in f]
+        self.dim = None
+        self.matrix = None
+        self._open()
+        # 인덱스 내용이 바뀔 때마다 증가 (번역 캐시 키에 사용)
+        self.version = len(self.chunks)
+
+    def _open(self):
+        if not self.chunks or not os.path.exists(self.matrix_path):
+            self.matrix = None
+            return
+        self.dim = os.path.getsize(self.matrix_path) // 4 // len(self.chunks)
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r', shape=(len(self.chunks), self.dim))
+
+    def documents(self):
+        with self.lock:
+            return {c['doc'] for c in self.chunks}
+
+    # 같은 내용의 문서는 한 번만 임베딩
+    def add_document(self, name, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self.documents():
+            return digest, 0
+        chunks = chunk_text(extract_text(name, data))
+        if not chunks:
+            return digest, 0
+        vectors = _normalize(self.embedder.embed(chunks)).astype(np.float32)
+        with self.lock:
+            self.matrix = None
+            with open(self.matrix_path, 'ab') as f:
+                f.write(vectors.tobytes())
+            with open(self.chunks_path, 'a', encoding='utf-8') as f:
+                for chunk in chunks:
+                    record = {'doc': digest, 'name': name, 'text': chunk}
+                    self.chunks.append(record)
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._open()
+            self.version += 1
+        return digest, len(chunks)
+
+    # 문서를 빼고 행렬과 메타데이터를 다시 씀
+    def remove_document(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            keep = [i for i, c in enumerate(self.chunks) if c['doc'] != digest]
+            if len(keep) == len(self.chunks):
+                return False
+            vectors = np.array(self.matrix[keep]) if self.matrix is not None else np.zeros((0, 0), np.float32)
+            self.chunks = [self.chunks[i] for i in keep]
+            self.matrix = None
+            # 검색 중인 memmap 이 깨지지 않도록 새 파일에 쓰고 교체
+            with open(self.matrix_path + ".tmp", 'wb') as f:
+                f.write(vectors.astype(np.float32).tobytes())
+            with open(self.chunks_path + ".tmp", 'w', encoding='utf-8') as f:
+                for record in self.chunks:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(self.matrix_path + ".tmp", self.matrix_path)
+            os.replace(self.chunks_path + ".tmp", self.chunks_path)
+            self._open()
+            self.version += 1
+        return True
+
+    # 질의와 가장 비슷한 조각 k 개 [(점수, 조각)]
+    def search(self, query, k=LOCAL_RAG_TOP_K):
+        with self.lock:
+            if self.matrix is None:
+                return []
+            matrix, chunks = self.matrix, self.chunks
+        q = _normalize(self.embedder.embed([query]))[0]
+        scores = matrix @ q
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), chunks[i]) for i in top]
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 단계별 지연 시간 측정 설정 (환경 변수)
+#   METRICS_PORT: Prometheus 텍스트 형식 /metrics 를 서빙할 포트 (0 이면 끔)
+#   METRICS_LOG: 요청별 단계 시간을 JSON 한 줄씩 남길 파일 (비어 있으면 끔)
+#   METRICS_SAMPLES: 백분위 계산에 쓰는 단계별 최근 측정값 수
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LOG = os.getenv("METRICS_LOG", "")
+METRICS_SAMPLES = int(os.getenv("METRICS_SAMPLES", "1024"))
+
+METRIC_NAME = "audio_translator_stage_seconds"
+
+# 히스토그램 버킷 경계 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 누적 버킷 카운트 + 최근 측정값 (백분위용)
+class Histogram:
+    def __init__(self, buckets=BUCKETS, samples=METRICS_SAMPLES):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=samples)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return 0.0
+        values = sorted(self.recent)
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+# 단계 이름별 히스토그램 모음
+class Registry:
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+        trace = getattr(self.local, "trace", None)
+        if trace is not None:
+            trace.setdefault(stage, []).append(round(seconds, 4))
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    # with registry.timer("tts"): ... 로 블록 실행 시간 기록
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # 요청 하나를 묶어서 이 스레드에서 측정된 단계 시간을 METRICS_LOG 에 한 줄로 남김
+    # (다른 스레드에서 측정된 단계는 히스토그램에만 들어감)
+    @contextmanager
+    def request(self, name, log_path=METRICS_LOG):
+        previous = getattr(self.local, "trace", None)
+        trace = self.local.trace = {}
+        start = time.perf_counter()
+        status = "error"
+        try:
+            yield trace
+            status = "ok"
+        finally:
+            total = time.perf_counter() - start
+            self.local.trace = previous
+            self.observe(name, total)
+            if log_path:
+                record = {"time": time.time(), "request": name, "status": status, "total": round(total, 4), "stages": trace}
+                with self.lock:
+                    with open(log_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # 단계별 {count, mean, p50, p95, p99} (초)
+    def summary(self):
+        with self.lock:
+            return {
+                stage: {
+                    "count": h.count,
+                    "mean": h.sum / h.count if h.count else 0.0,
+                    **{f"p{int(q * 100)}": h.quantile(q) for q in QUANTILES},
+                }
+                for stage, h in sorted(self.histograms.items())
+            }
+
+    # Prometheus 텍스트 형식
+    def render(self):
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each pipeline stage.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        quantile_lines = [
+            f"# HELP {METRIC_NAME}_recent Recent per-stage latency quantiles.",
+            f"# TYPE {METRIC_NAME}_recent summary",
+        ]
+        with self.lock:
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {h.count}')
+                for q in QUANTILES:
+                    quantile_lines.append(f'{METRIC_NAME}_recent{{stage="{stage}",quantile="{q:g}"}} {h.quantile(q):.6f}')
+                quantile_lines.append(f'{METRIC_NAME}_recent_sum{{stage="{stage}"}} {sum(h.recent):.6f}')
+                quantile_lines.append(f'{METRIC_NAME}_recent_count{{stage="{stage}"}} {len(h.recent)}')
+        return "\n".join(lines + quantile_lines) + "\n"
+
+# 프로세스 전체에서 쓰는 기본 레지스트리
+REGISTRY = Registry()
+
+def timer(stage):
+    return REGISTRY.timer(stage)
+
+def observe(stage, seconds):
+    REGISTRY.observe(stage, seconds)
+
+def request(name):
+    return REGISTRY.request(name)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# 백그라운드 스레드에서 /metrics 서버 시작 (port 가 0 이면 아무것도 안 함)
+def serve(port=METRICS_PORT, host="0.0.0.0"):
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+import httpx
+
+# OpenAI 클라이언트 설정 (환경 변수)
+#   OPENAI_MAX_CONCURRENCY: 동시에 보낼 수 있는 요청 수 (= 커넥션 풀 크기)
+#   OPENAI_REQUESTS_PER_MINUTE: 분당 요청 수 제한 (0 이면 제한 없음)
+#   OPENAI_MAX_RETRIES: 429 / 5xx / 연결 오류 재시도 횟수 (SDK 의 지수 백오프 + jitter 사용)
+#   OPENAI_TIMEOUT: 요청 하나의 제한 시간 (초)
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "0"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+# 분당 요청 수 제한 (토큰 버킷)
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = max(per_minute / 60.0, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# 동시 요청 수 + 분당 요청 수 제한
+class RequestLimiter:
+    def __init__(self, max_concurrency, requests_per_minute):
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+
+    def acquire(self):
+        if self.bucket:
+            self.bucket.acquire()
+        self.semaphore.acquire()
+
+    def release(self):
+        self.semaphore.release()
+
+# 응답 본문이 닫힐 때 제한 슬롯을 돌려주는 스트림 (스트리밍 응답은 끝까지 읽는 동안 커넥션을 계속 씀)
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream, release):
+        self.stream = stream
+        self.release = release
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            release, self.release = self.release, None
+            if release:
+                release()
+
+# 모든 HTTP 요청(재시도 포함)이 제한을 거치도록 하는 transport
+# 슬롯은 응답 본문이 닫힐 때까지 잡고 있어서, 풀 커넥션 수를 넘는 요청은 PoolTimeout 대신 여기서 대기
+class LimitedTransport(httpx.HTTPTransport):
+    def __init__(self, limiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def handle_request(self, request):
+        self.limiter.acquire()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self.limiter.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, self.limiter.release)
+        return response
+
+_lock = threading.Lock()
+_limiter = None
+_client = None
+
+def _get_limiter(max_concurrency, requests_per_minute):
+    global _limiter
+    if _limiter is None:
+        _limiter = RequestLimiter(max_concurrency or OPENAI_MAX_CONCURRENCY, requests_per_minute or OPENAI_REQUESTS_PER_MINUTE)
+    return _limiter
+
+def _pool_limits(max_concurrency):
+    size = max_concurrency or OPENAI_MAX_CONCURRENCY
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size, keepalive_expiry=60)
+
+# 프로세스 전체에서 공유하는 동기 클라이언트 (keep-alive 커넥션 풀 재사용)
+# 인자는 처음 만들 때만 적용됨
+def get_client(max_concurrency=None, requests_per_minute=None):
+    global _client
+    with _lock:
+        if _client is None:
+            # openai 패키지는 import 가 느려서 클라이언트를 처음 만들 때 가져옴
+            import openai
+            transport = LimitedTransport(_get_limiter(max_concurrency, requests_per_minute), limits=_pool_limits(max_concurrency))
+            _client = openai.OpenAI(
+                http_client=httpx.Client(transport=transport, timeout=OPENAI_TIMEOUT),
+                max_retries=OPENAI_MAX_RETRIES,
+                timeout=OPENAI_TIMEOUT
+            )
+        return _client
+
+# 속성에 처음 접근할 때 get_client() 로 공유 클라이언트를 만드는 지연 클라이언트
+# 앱 시작 시 openai import / 클라이언트 생성을 첫 API 호출까지 미룸
+class LazyClient:
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+# openai import 와 클라이언트 생성을 백그라운드 스레드에서 미리 해 둠
+def warm_up():
+    threading.Thread(target=get_client, name="openai-warmup", daemon=True).start()
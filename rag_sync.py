@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import caches
+
+# RAG 업로드 파일 동기화 설정 (환경 변수)
+#   RAG_UPLOAD_WORKERS: 동시에 업로드할 파일 수
+RAG_UPLOAD_WORKERS = int(os.getenv("RAG_UPLOAD_WORKERS", "4"))
+
+# 로컬 매니페스트: 파일 내용 해시 → {file_id, filename, vector_stores}
+# 매번 전체 파일 목록을 조회하지 않고 이미 올린 내용인지 바로 확인
+class FileManifest:
+    def __init__(self, path=os.path.join(caches.CACHE_DIR, "rag_manifest.json")):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            return {**entry, 'vector_stores': list(entry['vector_stores'])} if entry else None
+
+    def put(self, digest, entry):
+        with self.lock:
+            self.entries[digest] = entry
+            self._save()
+
+    # 벡터 스토어에 올라간 file_id 목록의 해시 (파일이 추가/삭제되면 바뀜, 번역 캐시 키에 사용)
+    def version(self, vector_store_id):
+        with self.lock:
+            file_ids = sorted(entry['file_id'] for entry in self.entries.values() if vector_store_id in entry['vector_stores'])
+        return hashlib.sha1("\n".join(file_ids).encode()).hexdigest()[:16]
+
+    def pop(self, digest):
+        with self.lock:
+            entry = self.entries.pop(digest, None)
+            self._save()
+            return entry
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+# 파일 하나를 벡터 스토어에 반영, (파일 이름, file_id, 상태) 반환
+#   "exists": 이미 같은 내용이 벡터 스토어에 있음, "attached": 올라가 있던 파일을 벡터 스토어에만 추가, "uploaded": 새로 업로드
+def sync_file(client, manifest, vector_store_id, name, data, digest=None):
+    digest = digest or content_digest(data)
+    entry = manifest.get(digest)
+    if entry and vector_store_id in entry['vector_stores']:
+        return name, entry['file_id'], "exists"
+
+    status = "attached"
+    if entry is None:
+        # 로컬 디스크에 쓰지 않고 메모리의 내용을 그대로 업로드
+        response = client.files.create(file=(name, data), purpose="assistants")
+        entry = {'file_id': response.id, 'filename': name, 'vector_stores': []}
+        manifest.put(digest, entry)
+        status = "uploaded"
+
+    client.vector_stores.files.create(vector_store_id=vector_store_id, file_id=entry['file_id'])
+    entry['vector_stores'].append(vector_store_id)
+    manifest.put(digest, entry)
+    return name, entry['file_id'], status
+
+# 여러 파일을 동시에 동기화, 파일마다 (이름, file_id, 상태) 또는 (이름, None, 예외) 반환
+# 내용이 같은 파일은 한 번만 올리고, 나머지 이름에는 같은 file_id 를 "exists" 로 돌려줌
+def sync_files(client, manifest, vector_store_id, files, max_workers=RAG_UPLOAD_WORKERS):
+    def run(digest, name, data):
+        try:
+            return sync_file(client, manifest, vector_store_id, name, data, digest)
+        except Exception as e:
+            return name, None, e
+
+    if not files:
+        return []
+    digests = [content_digest(data) for _, data in files]
+    unique = {}
+    for digest, (name, data) in zip(digests, files):
+        unique.setdefault(digest, (name, data))
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as executor:
+        results = dict(zip(unique, executor.map(lambda item: run(item[0], *item[1]), unique.items())))
+
+    synced = []
+    reported = set()
+    for digest, (name, _) in zip(digests, files):
+        _, file_id, status = results[digest]
+        if digest in reported and file_id is not None:
+            status = "exists"
+        reported.add(digest)
+        synced.append((name, file_id, status))
+    return synced
+
+# 내용 해시로 바로 찾아서 벡터 스토어와 OpenAI 파일에서 삭제, 삭제한 file_id 반환 (없으면 None)
+def remove_file(client, manifest, vector_store_id, data):
+    digest = content_digest(data)
+    entry = manifest.get(digest)
+    if entry is None:
+        return None
+    if vector_store_id in entry['vector_stores']:
+        client.vector_stores.files.delete(vector_store_id=vector_store_id, file_id=entry['file_id'])
+    client.files.delete(entry['file_id'])
+    manifest.pop(digest)
+    return entry['file_id']
@@ -0,0 +1,199 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import weakref
+from collections import OrderedDict
+
+# 메모리에 둘 최근 오디오 수 (환경 변수 RECORDING_CACHE_BLOBS, 0 이면 항상 디스크에서 읽음)
+RECORDING_CACHE_BLOBS = int(os.getenv("RECORDING_CACHE_BLOBS", "4"))
+
+# 녹음 한 개 (전사, 번역 텍스트 + 오디오 키 + 자막용 세그먼트 표)
+# 오디오 바이트는 레코드에 두지 않고 BlobStore 에서 필요할 때만 읽음
+class Recording:
+    __slots__ = ('id', 'transcription', 'ts_text', 'recorded_audio_key', 'tts_audio_key', 'retranslated_tts_audio_key', 'segments')
+
+    def __init__(self, rec_id, transcription, ts_text, recorded_audio_key, tts_audio_key, segments=None):
+        self.id = rec_id
+        self.transcription = transcription
+        self.ts_text = ts_text
+        self.recorded_audio_key = recorded_audio_key
+        self.tts_audio_key = tts_audio_key
+        self.retranslated_tts_audio_key = tts_audio_key
+        self.segments = segments
+
+# 오디오 바이트를 내용 해시(sha1) 이름의 임시 파일로 저장 (같은 내용은 한 번만 저장)
+# 키마다 참조 수를 세서 아무 레코드도 쓰지 않게 되면 파일 삭제
+# 최근에 읽거나 저장한 오디오(현재 페이지 등)는 메모리에 두고 rerun 마다 디스크를 읽지 않음
+# 스토어가 사라지면 임시 디렉터리도 같이 삭제
+class BlobStore:
+    def __init__(self, cache_size=RECORDING_CACHE_BLOBS):
+        self.dir = tempfile.mkdtemp(prefix="recordings_")
+        self.refs = {}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.dir, True)
+
+    def put(self, data):
+        key = hashlib.sha1(data).hexdigest()
+        if key not in self.refs:
+            path = os.path.join(self.dir, key)
+            with open(path + ".tmp", 'wb') as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            self.refs[key] = 0
+        self.refs[key] += 1
+        self._remember(key, data)
+        return key
+
+    def get(self, key):
+        data = self.cache.get(key)
+        if data is not None:
+            self.cache.move_to_end(key)
+            return data
+        with open(os.path.join(self.dir, key), 'rb') as f:
+            data = f.read()
+        self._remember(key, data)
+        return data
+
+    def retain(self, key):
+        self.refs[key] += 1
+        return key
+
+    # 참조 하나를 놓고, 더 이상 쓰는 곳이 없으면 파일 삭제
+    def release(self, key):
+        self.refs[key] -= 1
+        if self.refs[key] > 0:
+            return
+        del self.refs[key]
+        self.cache.pop(key, None)
+        try:
+            os.remove(os.path.join(self.dir, key))
+        except FileNotFoundError:
+            pass
+
+    def _remember(self, key, data):
+        if self.cache_size <= 0:
+            return
+        self.cache[key] = data
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+# 세션의 녹음 목록
+# 레코드는 고정 id 로 dict 에 두고, 화면 순서는 id 로 이어진 이중 연결 리스트 (prev / next dict) 로 유지
+# 추가/삭제/이동은 해당 id 의 앞뒤 연결만 바꿈
+# 위치로 조회할 때 쓰는 id 리스트 / 위치 dict 는 순서가 바뀐 뒤 처음 조회할 때 한 번만 다시 만듦
+class RecordingStore:
+    def __init__(self):
+        self.records = {}
+        self.blobs = BlobStore()
+        self.next_id = 1
+        self._prev = {}
+        self._next = {}
+        self._head = None
+        self._tail = None
+        self._order = []
+        self._positions = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return (self.records[rec_id] for rec_id in self._ids())
+
+    def ids(self):
+        return list(self._ids())
+
+    # 0부터 시작하는 위치로 레코드 조회
+    def at(self, index):
+        return self.records[self._ids()[index]]
+
+    def recorded_audio(self, rec_id):
+        return self.blobs.get(self.records[rec_id].recorded_audio_key)
+
+    def tts_audio(self, rec_id):
+        return self.blobs.get(self.records[rec_id].tts_audio_key)
+
+    # index 위치에 새 녹음을 넣고 id 반환
+    def insert(self, index, transcription, recorded_audio, ts_text, tts_audio, segments=None):
+        rec_id = self.next_id
+        self.next_id += 1
+        tts_audio_key = self.blobs.put(tts_audio)
+        # retranslated_tts_audio_key 도 같은 키를 가리키므로 참조 하나 더
+        self.blobs.retain(tts_audio_key)
+        self.records[rec_id] = Recording(rec_id, transcription, ts_text, self.blobs.put(recorded_audio), tts_audio_key, segments)
+        self._link_before(rec_id, self._id_at(index))
+        return rec_id
+
+    def delete(self, rec_id):
+        record = self.records.pop(rec_id)
+        self._unlink(rec_id)
+        for key in (record.recorded_audio_key, record.tts_audio_key, record.retranslated_tts_audio_key):
+            self.blobs.release(key)
+
+    # 레코드를 index 위치로 옮김 (0부터 시작, 옮긴 뒤의 위치)
+    def move(self, rec_id, index):
+        # 자기 자신보다 뒤로 가면 빠진 자리만큼 한 칸 뒤의 레코드 앞에 넣음
+        index = max(index, 0)
+        before = self._id_at(index + 1 if index >= self._position(rec_id) else index)
+        if before == rec_id:
+            return
+        self._unlink(rec_id)
+        self._link_before(rec_id, before)
+
+    # before 앞에 연결 (before 가 None 이면 맨 뒤)
+    def _link_before(self, rec_id, before):
+        prev = self._tail if before is None else self._prev[before]
+        self._prev[rec_id] = prev
+        self._next[rec_id] = before
+        if prev is None:
+            self._head = rec_id
+        else:
+            self._next[prev] = rec_id
+        if before is None:
+            self._tail = rec_id
+        else:
+            self._prev[before] = rec_id
+        self._order = None
+
+    def _unlink(self, rec_id):
+        prev = self._prev.pop(rec_id)
+        after = self._next.pop(rec_id)
+        if prev is None:
+            self._head = after
+        else:
+            self._next[prev] = after
+        if after is None:
+            self._tail = prev
+        else:
+            self._prev[after] = prev
+        self._order = None
+
+    def _ids(self):
+        if self._order is None:
+            order = []
+            rec_id = self._head
+            while rec_id is not None:
+                order.append(rec_id)
+                rec_id = self._next[rec_id]
+            self._order = order
+            self._positions = {rec_id: n for n, rec_id in enumerate(order)}
+        return self._order
+
+    def _position(self, rec_id):
+        self._ids()
+        return self._positions[rec_id]
+
+    # index 위치의 id (음수면 맨 앞, 맨 뒤 다음이면 None)
+    def _id_at(self, index):
+        ids = self._ids()
+        index = max(index, 0)
+        return ids[index] if index < len(ids) else None
+
+    def update_translation(self, rec_id, ts_text, tts_audio):
+        record = self.records[rec_id]
+        old_key = record.retranslated_tts_audio_key
+        record.ts_text = ts_text
+        record.retranslated_tts_audio_key = self.blobs.put(tts_audio)
+        self.blobs.release(old_key)
@@ -0,0 +1,98 @@
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# 문장 단위 TTS 파이프라인 설정 (환경 변수)
+#   PIPELINE_TTS_WORKERS: 동시에 보낼 TTS 요청 수
+#   PIPELINE_MIN_SENTENCE_CHARS: 이보다 짧은 문장은 다음 문장과 합쳐서 TTS
+#   PIPELINE_PLAYBACK_GAP: 앞 음성이 끝났다고 보기 전에 더 기다리는 시간 (초, 브라우저 로딩 지연 보정)
+PIPELINE_TTS_WORKERS = int(os.getenv("PIPELINE_TTS_WORKERS", "3"))
+PIPELINE_MIN_SENTENCE_CHARS = int(os.getenv("PIPELINE_MIN_SENTENCE_CHARS", "20"))
+PIPELINE_PLAYBACK_GAP = float(os.getenv("PIPELINE_PLAYBACK_GAP", "0.3"))
+
+# 문장 끝: 영문 구두점 뒤 공백, 전각/힌디어 구두점, 줄바꿈
+_SENTENCE_END = re.compile(r'[.!?](?=\s)|[。！？।]|\n')
+
+def pop_sentences(buffer, min_chars=PIPELINE_MIN_SENTENCE_CHARS):
+    sentences = []
+    start = 0
+    for m in _SENTENCE_END.finditer(buffer):
+        sentence = buffer[start:m.end()].strip()
+        if len(sentence) >= min_chars:
+            sentences.append(sentence)
+            start = m.end()
+    return sentences, buffer[start:]
+
+# 번역 텍스트가 들어오는 대로 문장을 잘라 TTS 를 병렬로 요청하고,
+# 완성된 음성을 문장 순서대로 on_audio(index, audio) 로 넘겨줌
+class SpeechPipeline:
+    def __init__(self, speak, on_audio=None, max_workers=PIPELINE_TTS_WORKERS, min_chars=PIPELINE_MIN_SENTENCE_CHARS):
+        self.speak = speak
+        self.on_audio = on_audio
+        self.min_chars = min_chars
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.pending = deque()
+        self.audios = []
+        self.seen = ""
+        self.buffer = ""
+
+    # 지금까지 번역된 전체 텍스트를 전달 (translate 의 on_partial 로 사용)
+    def feed(self, text):
+        self.buffer += text[len(self.seen):]
+        self.seen = text
+        sentences, self.buffer = pop_sentences(self.buffer, self.min_chars)
+        for sentence in sentences:
+            self.pending.append(self.executor.submit(self.speak, sentence))
+        self._drain(wait=False)
+
+    # 번역이 끝나면 남은 텍스트까지 TTS 를 요청하고 모든 문장의 음성을 순서대로 반환
+    def close(self, text):
+        self.feed(text)
+        if self.buffer.strip():
+            self.pending.append(self.executor.submit(self.speak, self.buffer.strip()))
+            self.buffer = ""
+        try:
+            self._drain(wait=True)
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        return self.audios
+
+    def _drain(self, wait):
+        while self.pending and (wait or self.pending[0].done()):
+            audio = self.pending.popleft().result()
+            if self.on_audio:
+                self.on_audio(len(self.audios), audio)
+            self.audios.append(audio)
+
+# 문장별 음성을 차례로 이어서 재생
+# 앞 음성이 끝나기 전에 다음 플레이어를 자동 재생하면 겹쳐 들리므로, 재생 중에 도착한 문장은 모아 두었다가
+# 앞 음성이 끝난 뒤 이어붙여서 play(audio) 로 한 번에 재생
+class ChainedPlayer:
+    def __init__(self, play, duration, join=b"".join, gap=PIPELINE_PLAYBACK_GAP):
+        self.play = play
+        self.duration = duration
+        self.join = join
+        self.gap = gap
+        self.queued = []
+        self.ends_at = 0.0
+
+    # 문장 음성 추가, 재생 중인 음성이 없으면 바로 재생 (기다리지 않음)
+    def add(self, audio):
+        self.queued.append(audio)
+        if time.monotonic() >= self.ends_at:
+            self._flush()
+
+    # 남은 음성을 모두 재생하고 끝날 때까지 기다림
+    def finish(self):
+        while self.queued:
+            time.sleep(max(0.0, self.ends_at - time.monotonic()))
+            self._flush()
+        time.sleep(max(0.0, self.ends_at - time.monotonic()))
+
+    def _flush(self):
+        audio = self.join(self.queued)
+        self.queued = []
+        self.play(audio)
+        self.ends_at = time.monotonic() + self.duration(audio) + self.gap
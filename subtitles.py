@@ -0,0 +1,75 @@
+import os
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+# 자막 번역 설정 (환경 변수)
+#   SUBTITLE_BATCH_SIZE: 번역 요청 하나에 넣을 세그먼트 수
+#   SUBTITLE_WORKERS: 동시에 보낼 번역 요청 수
+SUBTITLE_BATCH_SIZE = int(os.getenv("SUBTITLE_BATCH_SIZE", "40"))
+SUBTITLE_WORKERS = int(os.getenv("SUBTITLE_WORKERS", "4"))
+
+# 세그먼트 목록 (시작/끝 시간은 float64 배열, 텍스트는 같은 순서의 리스트)
+# 세그먼트마다 dict 를 두는 것보다 작음 (녹음마다 세션에 계속 들고 있음)
+class SegmentTable:
+    __slots__ = ('starts', 'ends', 'texts')
+
+    def __init__(self, starts=(), ends=(), texts=()):
+        self.starts = array('d', starts)
+        self.ends = array('d', ends)
+        self.texts = list(texts)
+
+    @classmethod
+    def from_segments(cls, segments):
+        table = cls()
+        for seg in segments:
+            table.append(seg['start'], seg['end'], seg['text'])
+        return table
+
+    def append(self, start, end, text):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.texts.append(text.strip())
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, self.texts)
+
+    # 같은 시간에 텍스트만 바꾼 표 (번역 자막용)
+    def with_texts(self, texts):
+        if len(texts) != len(self):
+            raise ValueError(f"Expected {len(self)} texts, got {len(texts)}")
+        return SegmentTable(self.starts, self.ends, texts)
+
+# 초 → "HH:MM:SS,mmm" (SRT) / "HH:MM:SS.mmm" (VTT)
+def format_timestamp(seconds, separator=","):
+    millis = int(round(max(seconds, 0.0) * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def to_srt(table):
+    blocks = []
+    for n, (start, end, text) in enumerate(table, 1):
+        blocks.append(f"{n}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n")
+    return "\n".join(blocks)
+
+def to_vtt(table):
+    blocks = ["WEBVTT\n"]
+    for start, end, text in table:
+        blocks.append(f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text}\n")
+    return "\n".join(blocks)
+
+FORMATS = {'srt': to_srt, 'vtt': to_vtt}
+
+# 세그먼트를 batch_size 개씩 묶어서 translate_batch(텍스트 리스트) → 같은 길이의 번역 리스트 로 번역
+# 묶음들은 동시에 요청하고, 결과는 원래 세그먼트 순서에 맞춰서 번역 자막 표로 반환
+def translate_table(table, translate_batch, batch_size=SUBTITLE_BATCH_SIZE, max_workers=SUBTITLE_WORKERS):
+    batches = [table.texts[i:i + batch_size] for i in range(0, len(table), batch_size)]
+    if not batches:
+        return table.with_texts([])
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+        results = list(executor.map(translate_batch, batches))
+    return table.with_texts([text for batch in results for text in batch])
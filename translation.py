@@ -0,0 +1,135 @@
+import os
+import re
+import time
+import metrics
+
+TRANSLATION_MODEL = "gpt-4o"
+ASSISTANT_ID = "asst_QvnqTXw1LoxeqmwHAn2IMVoW"
+# 어시스턴트의 file_search 가 쓰는 벡터 스토어
+VECTOR_STORE_ID = "vs_bHT7TcS6HrVHAYcNgeh48lKE"
+
+# gpt_call 전체 제한 시간 (초)
+GPT_CALL_TIMEOUT = float(os.getenv("GPT_CALL_TIMEOUT", "25"))
+
+# passages 를 넘기면 (로컬 RAG 검색 결과) 그 내용을 참고해서 발언을 보강한 뒤 번역
+def translator_call(client, text, selected_language, selected_tone, on_partial=None, passages=None):
+    content = f"First Your main task is to translate given text to {selected_language}. Do not provide me with anything other than the translation. for example 저는 회계 원리를 좋아합니다 -> 我喜欢会计原理 is a very wrong example"
+    if selected_tone == "Politely and Academically":
+        content += "and Second, the tone of the translated sentences must be very polite and academic. this mean you can change the word to be very polite and academic"
+    if selected_tone == "Angry and Fierce":
+        content += "and Second, the tone of the translated sentences must be very angry and fierce. this mean you can change the word to be very angry and fierce"
+    if passages:
+        content = f"You are a presentation script maker. Read the user's statements and the reference passages below thoroughly, and if there is content in the passages that can enrich the user's statements, use it to enhance the user's statements. Please translate the enriched content into {selected_language} and provide it to the user, and no other language. Do not include citations or references in the response."
+        if selected_tone == "Politely and Academically":
+            content += " The tone of the translated sentences must be very polite and academic."
+        content += "\n\nReference passages:\n" + "\n---\n".join(passages)
+    result = ""
+    # 요청을 보내는 시점부터 측정 (create() 가 응답 헤더까지 기다리므로 그 뒤에 재면 첫 토큰 시간이 빠짐)
+    with metrics.timer("translate"):
+        start = time.perf_counter()
+        stream = client.chat.completions.create(
+            model=TRANSLATION_MODEL,
+            messages=[
+                {"role": "system", "content": content},
+                {"role": "user", "content": text}
+            ],
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not result:
+                    metrics.observe("translate_first_token", time.perf_counter() - start)
+                result += chunk.choices[0].delta.content
+                if on_partial:
+                    on_partial(result)
+    return result
+
+# 자막 세그먼트 여러 개를 요청 한 번으로 번역, [n] 번호로 원래 세그먼트와 맞춤
+# 번역된 줄 번호가 맞지 않으면 세그먼트별로 따로 번역
+def translate_batch(client, texts, selected_language, selected_tone):
+    content = f"Translate each numbered line of the user's text to {selected_language}. Keep the [n] number at the start of every line, keep the same number of lines in the same order, and do not provide anything other than the translated lines."
+    if selected_tone == "Politely and Academically":
+        content += " The tone of the translated sentences must be very polite and academic."
+    numbered = "\n".join(f"[{n}] {' '.join(text.split())}" for n, text in enumerate(texts, 1))
+    with metrics.timer("translate_batch"):
+        response = client.chat.completions.create(
+            model=TRANSLATION_MODEL,
+            messages=[
+                {"role": "system", "content": content},
+                {"role": "user", "content": numbered}
+            ]
+        )
+    lines = {}
+    for line in (response.choices[0].message.content or "").splitlines():
+        match = re.match(r"\s*\[(\d+)\]\s*(.*)", line)
+        if match:
+            lines[int(match.group(1))] = match.group(2).strip()
+    if sorted(lines) != list(range(1, len(texts) + 1)):
+        return [translator_call(client, text, selected_language, selected_tone) for text in texts]
+    return [lines[n] for n in range(1, len(texts) + 1)]
+
+# Assistants run 을 스트리밍으로 실행하면서 생성되는 텍스트 조각을 바로 yield
+# timeout 안에 끝나지 않으면 run 을 취소하고 TimeoutError 발생
+def gpt_call_stream(client, text, selected_language, selected_tone, thread_id, timeout=GPT_CALL_TIMEOUT):
+    import openai
+    deadline = time.monotonic() + timeout
+
+    # SDK 재시도 없이, 남은 시간만큼만 기다리는 클라이언트 (연결 / 첫 바이트 지연도 제한 시간에 포함)
+    def limited():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError
+        return client.with_options(max_retries=0, timeout=remaining)
+
+    content = f"You are a presentation script maker. Access the user's statements and the given files, read them thoroughly, and if there is content in the provided files that can enrich the user's statements, use it to enhance the user's statements. Convey the enriched content exactly as it is to the user. Please translate the enriched content into {selected_language} and provide it to the user, and no other language. and Do not include automatically generated citations or references in the response under any circumstances."
+
+    if selected_tone == "Politely and Academically":
+        content += " and the tone of the translated sentences must be very polite and academic. this mean you can change the word to be very polite and academic"
+    if selected_tone == "Angry and Fierce":
+        content += " and the tone of the translated sentences must be very angry and fierce. this mean you can change the word to be very angry and fierce"
+
+    #과거 recording 참조 금지
+    content += "Finally, never reference the context within the thread."
+    
+    stream = None
+    try:
+        limited().beta.threads.messages.create(thread_id, role="user", content=text)
+        stream_manager = limited().beta.threads.runs.stream(
+            thread_id=thread_id,
+            assistant_id=ASSISTANT_ID,
+            instructions=content
+        )
+        with stream_manager as stream:
+            # 텍스트가 나오기 전 단계(file_search 등)도 제한 시간에 포함되도록 모든 이벤트마다 확인
+            for event in stream:
+                if time.monotonic() > deadline:
+                    raise TimeoutError
+                if event.event != "thread.message.delta" or not event.data.delta.content:
+                    continue
+                for block in event.data.delta.content:
+                    if block.type == "text" and block.text and block.text.value:
+                        yield block.text.value
+    except (TimeoutError, openai.APITimeoutError) as e:
+        # 끝나지 않은 run 은 취소해서 스레드가 잠긴 채로 남지 않게 함
+        if stream is not None and stream.current_run is not None:
+            try:
+                client.beta.threads.runs.cancel(thread_id=thread_id, run_id=stream.current_run.id)
+            except openai.OpenAIError:
+                pass
+        raise TimeoutError(f"The process was not completed within {timeout:g} seconds.") from e
+
+def gpt_call(client, text, selected_language, selected_tone, thread_lease, on_partial=None):
+    result = ""
+    try:
+        # run 생성부터 첫 텍스트 조각까지 (예전 polling 대기 시간에 해당) 와 전체 시간을 따로 기록
+        with metrics.timer("translate_rag"):
+            start = time.perf_counter()
+            for delta in gpt_call_stream(client, text, selected_language, selected_tone, thread_lease.thread_id):
+                if not result:
+                    metrics.observe("translate_rag_first_token", time.perf_counter() - start)
+                result += delta
+                if on_partial:
+                    on_partial(result)
+    finally:
+        thread_lease.record_run()
+    return result
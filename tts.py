@@ -0,0 +1,39 @@
+import io
+import caches
+import metrics
+
+TTS_MODEL = "tts-1"
+TTS_VOICE = "echo" #voice 설정 가능하면 참 좋을텐데
+TTS_FORMAT = "mp3"
+
+# TTS 결과를 임시 파일 없이 mp3 바이트로 반환 (st.audio 에 바로 전달 가능)
+# 같은 텍스트/음성/모델/포맷으로 합성한 적이 있으면 캐시에서 반환
+def text_to_speech(client, text, cache=None):
+    cache_key = caches.tts_key(text, TTS_VOICE, TTS_MODEL, TTS_FORMAT)
+    if cache is not None:
+        audio_bytes = cache.get(cache_key)
+        if audio_bytes is not None:
+            return audio_bytes
+
+    with metrics.timer("tts"):
+        response = client.audio.speech.create(
+            model=TTS_MODEL,
+            voice=TTS_VOICE,
+            input=text,
+            response_format=TTS_FORMAT
+        )
+        audio_bytes = response.read()
+    if cache is not None:
+        cache.set(cache_key, audio_bytes)
+    return audio_bytes
+
+# mp3 바이트의 재생 시간 (초), 디코딩하지 않고 프레임 길이만 더함 (이어붙인 mp3 도 전체 길이)
+def audio_duration(audio_bytes):
+    import av
+    with av.open(io.BytesIO(audio_bytes)) as container:
+        stream = container.streams.audio[0]
+        return sum(float(packet.duration * packet.time_base) for packet in container.demux(stream) if packet.duration)
+
+# 문장별 TTS mp3 를 하나로 이어붙이기 (mp3 프레임은 재인코딩 없이 이어붙일 수 있음)
+def join_audio_files(audio_files):
+    return b"".join(audio_files)
@@ -1,33 +1,41 @@
 import streamlit as st
 from streamlit_mic_recorder import mic_recorder
-import whisper
-import tempfile
-import openai
 import os
 import warnings
-import base64
+import asr
+import assets
 
 # Suppress FP16 warning
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
 
-# Load the Whisper model
+# Load the ASR engine (ASR_BACKEND 환경 변수로 백엔드 선택)
+# 로드는 백그라운드에서 하고 화면은 바로 그림
 @st.cache_resource
 def load_whisper_model():
-    return whisper.load_model("base")
+    return asr.load_in_background(asr.load_engine, "base")
 
-model = load_whisper_model()
+model_loading = load_whisper_model()
 
 # Set OpenAI API key
 api_key = os.getenv('OPENAI_API_KEY')
 if not api_key:
     raise ValueError("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
-openai.api_key = api_key
-
-def transcribe_audio(file_path):
-    result = model.transcribe(file_path)
-    return result['text']
 
+# 녹음을 윈도우 단위로 전사하면서 중간 결과를 on_partial 로 전달
+def transcribe_audio(audio_data, on_partial=None):
+    if not model_loading.done():
+        with st.spinner("Loading speech recognition model..."):
+            model_loading.result()
+    text = ""
+    for text in asr.transcribe_stream(model_loading.result(), audio_data, language=None):
+        if on_partial:
+            on_partial(text)
+    return text
+
+# openai 는 import 가 느려서 처음 번역할 때 가져옴
 def gpt_call(text, selected_language):
+    import openai
+    openai.api_key = api_key
     response = openai.ChatCompletion.create(
         model="gpt-3.5-turbo",
         messages=[
@@ -37,23 +45,18 @@ def gpt_call(text, selected_language):
     )
     return response.choices[0].message['content']
 
-# 이미지 Base64 인코딩
-def get_base64_of_bin_file(bin_file):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
 img_file = r'C:\Users\user\Desktop\경희대\학부연구생\b64356e6-f699-44ea-a49b-5595e4511d86.jpeg'
 
 if not os.path.exists(img_file):
     st.error(f"File not found: {img_file}")
 else:
-    img_base64 = get_base64_of_bin_file(img_file)
+    # 축소/압축된 배경 이미지를 한 번만 만들어 정적 파일로 서빙 (rerun 마다 base64 로 다시 보내지 않음)
+    img_url = assets.background_image_url(img_file)
 
     st.markdown(f"""
     <style>
     .stApp {{
-        background : url('data:image/jpeg;base64,{img_base64}');
+        background : url('{img_url}');
         background-size: cover;
         font-family: Arial, Helvetica, sans-serif;
     }}
@@ -133,16 +136,16 @@ else:
     if selected_language != st.session_state.selected_language:
         st.session_state.selected_language = selected_language
 
+    if not model_loading.done():
+        st.caption("Loading speech model...")
+
     audio = mic_recorder(start_prompt="Start", stop_prompt="Stop", format="webm", just_once=True)
 
     if audio:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp_wav_file:
-            tmp_wav_file.write(audio["bytes"])
-            tmp_wav_file.flush()
-            file_path = tmp_wav_file.name
-
-        st.audio(file_path, format='audio/webm')
-        transcription = transcribe_audio(file_path)
+        st.audio(audio["bytes"], format='audio/webm')
+        partial_text = st.empty()
+        transcription = transcribe_audio(audio["bytes"], on_partial=partial_text.write)
+        partial_text.empty()
         ts_text = gpt_call(transcription, selected_language)
         st.write("Transcription:")
         st.write(transcription)
@@ -156,6 +159,5 @@ else:
         #     st.audio(tts_audio_data, format='audio/mp3', autoplay=True)
 
         # Delete temporary files
-        os.remove(file_path)
         # if tts_audio_data:
         #     os.remove(tts_audio_data)
@@ -0,0 +1,78 @@
+import os
+import numpy as np
+
+# 에너지 기반 VAD 설정 (환경 변수)
+#   ASR_VAD: 1 이면 전사 전에 무음 구간 제거
+#   VAD_MARGIN_DB: 배경 소음 레벨보다 이만큼 크면 음성으로 판단
+#   VAD_SILENCE_DB: 가장 큰 프레임도 이보다 작으면 음성이 없는 오디오로 봄
+VAD_ENABLED = os.getenv("ASR_VAD", "1") == "1"
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+VAD_SILENCE_DB = float(os.getenv("VAD_SILENCE_DB", "-55"))
+VAD_FRAME_MS = 30
+VAD_MIN_SILENCE_MS = 500
+VAD_MIN_SPEECH_MS = 250
+VAD_PAD_MS = 200
+
+# 프레임별 RMS 에너지 (dB)
+def frame_energy_db(audio, frame):
+    n = len(audio) // frame
+    frames = audio[:n * frame].reshape(n, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+# 음성 구간 목록 [(시작 샘플, 끝 샘플)]
+def speech_regions(audio, sr, frame_ms=VAD_FRAME_MS, margin_db=VAD_MARGIN_DB, silence_db=VAD_SILENCE_DB, min_silence_ms=VAD_MIN_SILENCE_MS, min_speech_ms=VAD_MIN_SPEECH_MS, pad_ms=VAD_PAD_MS):
+    frame = int(sr * frame_ms / 1000)
+    energy = frame_energy_db(audio, frame)
+    if len(energy) == 0 or energy.max() < silence_db:
+        return []
+
+    # 배경 소음(하위 10%)보다 margin 만큼 크고, 최대 레벨보다 20dB 이상 작지 않은 구간을 음성으로 봄
+    # 최대 레벨 기준이 소음 레벨까지 내려가면 소음만 있는 오디오가 전부 음성이 되므로 소음보다 margin/2 위로 제한
+    noise_floor = np.percentile(energy, 10)
+    threshold = max(min(max(noise_floor + margin_db, silence_db), energy.max() - 20.0), noise_floor + margin_db / 2)
+    voiced = np.concatenate(([False], energy > threshold, [False]))
+    edges = np.flatnonzero(np.diff(voiced.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+
+    # 짧은 무음은 메우고, 짧은 음성은 버리고, 앞뒤로 여유를 둠
+    min_gap = min_silence_ms // frame_ms
+    regions = []
+    for start, end in zip(starts, ends):
+        if regions and start - regions[-1][1] < min_gap:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    pad = int(sr * pad_ms / 1000)
+    result = []
+    for start, end in regions:
+        if (end - start) * frame_ms < min_speech_ms:
+            continue
+        start = max(int(start) * frame - pad, 0)
+        end = min(int(end) * frame + pad, len(audio))
+        if result and start <= result[-1][1]:
+            result[-1] = (result[-1][0], end)
+        else:
+            result.append((start, end))
+    return result
+
+# 음성 구간만 이어붙인 오디오와 구간 맵 [(압축 후 시작 샘플, 원본 시작 샘플, 길이)] 반환
+def trim_silence(audio, sr):
+    regions = speech_regions(audio, sr)
+    segment_map = []
+    offset = 0
+    for start, end in regions:
+        segment_map.append((offset, start, end - start))
+        offset += end - start
+    if not regions:
+        return audio[:0], segment_map
+    return np.concatenate([audio[start:end] for start, end in regions]), segment_map
+
+# 압축된 오디오의 시간(초)을 원본 오디오의 시간으로 변환
+def to_original_time(t, segment_map, sr):
+    sample = t * sr
+    for compact_start, original_start, length in reversed(segment_map):
+        if sample >= compact_start:
+            return float(original_start + min(sample - compact_start, length)) / sr
+    return t